@@ -5,6 +5,8 @@ The reason behind this exact choice is found in the nature of
 the functions being full of peaks and singularities (Ackley, Rastrigin) or
 with very low moduli of partial derivatives values(Himmelblau, Rosenbrock).
 Dedicated links in Readme.md
+Coordinates can be either scalars or numpy arrays: the latter allows 
+batched evaluation of many points at once.
 """
 
 import numpy as np
@@ -21,8 +23,8 @@ def ackley_fn (X):
     y = X[1]
     exp1 = np.exp(-0.2 * np.sqrt(0.5 * (x**2 + y**2)))
     exp2 = np.exp(0.5 * (np.cos(2 * np.pi * x) + np.cos(2 * np.pi * y))) 
-    assert type(exp1) == np.float64
-    assert type(exp2) == np.float64     
+    assert np.result_type(exp1) == np.float64
+    assert np.result_type(exp2) == np.float64     
     return -20 * exp1 - exp2 + np.e + 20
 
 
@@ -36,7 +38,7 @@ def himmelblau_fn (X):
     x = X[0]
     y = X[1]
     b = np.square(x**2 + y - 11) + np.square(x + y**2 - 7)
-    assert type(b) == np.float64
+    assert np.result_type(b) == np.float64
     return b
 
     
@@ -50,7 +52,7 @@ def rastrigin_fn (X):
     x = X[0]
     y = X[1]
     c = 20 + x**2 + y**2 - 10 * (np.cos(2 * np.pi * x) + np.cos(2 * np.pi * y))
-    assert type(c) == np.float64
+    assert np.result_type(c) == np.float64
     return c
 
 
@@ -64,5 +66,5 @@ def rosenbrock_fn (X):
     x = X[0]
     y = X[1]
     d = np.square(1 - x) + 100 * np.square(y - x**2)
-    assert type(d) == np.float64
+    assert np.result_type(d) == np.float64
     return d
\ No newline at end of file
@@ -1,13 +1,42 @@
 #------------------------------------------------------#
 #------------Simulated Anneanling algorithm------------#
 #------------------------------------------------------#
+import time
+from collections import namedtuple
+
 import numpy as np
 from numpy import random as rnd
-from core_functions import tolerance, objective_limit
+import core_functions
+from core_functions import ToleranceWindow, bounds, objective_limit, random_stream
+from instrumentation import RunStats
+from trajectory import Trajectory
+
+exit_types = {
+    0 : 'Max Iter',
+    1 : 'Tolerance',
+    2 : 'Obj Limit',
+    3 : 'Temp Limit'
+    }
+
+class AnnealingResult(namedtuple('AnnealingResult', ['states', 'energies', 'temperatures', 'k', 'exit', 'reann',
+                                                       'best_state', 'best_energy'])):
+    """
+    Outcome of <<simulated_annealing>>. The RunStats of the run are attached as the
+    <<stats>> attribute, alongside the tuple fields (None if they were not collected).
+    """
+
+    stats = None
+
+    def __new__(cls, *fields, stats = None, **named_fields):
+        self = super().__new__(cls, *fields, **named_fields)
+        self.stats = stats
+        return self
 
-def initialization(initial_temp, interval):
+def initialization(initial_temp, interval, dim = 2, rng = rnd):
 
-    s = (rnd.uniform(interval[0], interval[1]), rnd.uniform(interval[0], interval[1]))
+    #one coordinate per dimension: dim is only used if interval is shared by every coordinate
+    lower, upper = bounds(interval, dim)
+    s = rng.uniform(lower, upper)
     T = initial_temp
 
     return  s, T
@@ -16,7 +45,8 @@ def initialization(initial_temp, interval):
 
 def simulated_annealing(cooling, acceptance_prob, energy, move, interval, initial_temp = 100., 
                         k_max = 1e10, tolerance_value = 1e-6, tolerance_iter = 10,
-                        obj_fn_limit = -1e10, reann_tol = 100, verbose = False):
+                        obj_fn_limit = -1e10, reann_tol = 100, verbose = False, recorder = None,
+                        rng = None, observer = None):
 
     """
     The algorithm is aimed to iterate a specific procedure in order
@@ -51,13 +81,16 @@ def simulated_annealing(cooling, acceptance_prob, energy, move, interval, initia
                      for data acceptance or rejection.
         
     energy: float
-            Specific Gibbs free energy
+            Specific Gibbs free energy. It is evaluated once per proposed state: 
+            wrap it in <<EnergyCache>> to memoize repeated visits.
         
     move: function
-          It applies the definition of boltz_move for generating new candidates.
+          It applies the definition of boltz_move for generating new candidates;
+          it is called as move(state, temperature, interval, rng).
         
     interval: list-like
-              Estremes of a given interval.
+              Estremes of a given interval (a, b), shared by the two coordinates of the state,
+              or per-dimension intervals [(a_1, b_1), ..., (a_N, b_N)] for N-dimensional states.
     
     initial_temp: float
                   Parameter to be set from output [else: default initial temperature]
@@ -79,30 +112,123 @@ def simulated_annealing(cooling, acceptance_prob, energy, move, interval, initia
                
     [verbose: bool
               It makes the system print out further details of iteration procedures.]
+              
+    [recorder: Trajectory
+               Recorder of the visited states (see trajectory.py), it allows to choose
+               the recording mode; default: every iteration is recorded.]
+               
+    [rng: numpy Generator, int or SeedSequence
+          Source of random numbers, wrapped in a <<BlockRandom>> drawing them in blocks;
+          default: the global numpy.random module.]
+          
+    [observer: Observer
+               Callbacks notified on step, acceptance, rejection, re-annealing and exit
+               (see instrumentation.py); default: none.]
+    
+    Returns
+    ----------
+    AnnealingResult: namedtuple
+                     (states, energies, temperatures, k, exit, reann, best_state, best_energy):
+                     recorded states with their energies and temperatures (numpy arrays)
+                     since the last re-annealing, number of iterations, exit criterion, 
+                     re-annealing flag and the best solution found over the whole run.
+                     Its <<stats>> attribute holds the RunStats counters of the run.
+    
+    """
+
+    steps = _annealing(cooling, acceptance_prob, energy, move, interval, initial_temp, k_max,
+                       tolerance_value, tolerance_iter, obj_fn_limit, reann_tol, verbose, recorder,
+                       rng, observer, emit = False)
+    try:
+        next(steps)
+    except StopIteration as stop:
+        return stop.value
+
+
+def iter_annealing(cooling, acceptance_prob, energy, move, interval, initial_temp = 100., 
+                   k_max = 1e10, tolerance_value = 1e-6, tolerance_iter = 10,
+                   obj_fn_limit = -1e10, reann_tol = 100, verbose = False, recorder = None,
+                   rng = None, chunk_size = None, observer = None):
+
+    """
+    Streaming form of <<simulated_annealing>>: same parameters, exit criteria and
+    re-annealing logic, but a lightweight StepRecord is yielded after every iteration
+    so that the caller can consume, filter or stop the search whenever it wants.
+    Nothing is recorded unless a recorder is explicitly given.
     
+    StepRecord fields describe the chain at the end of the iteration:
+    k, state, energy, temperature, accepted (the proposed move was accepted), 
+    reann (re-annealing was performed), best_energy, exit (exit criterion on the 
+    last record, None otherwise).
+    
+    Parameters
+    ----------
+    chunk_size: int
+                If given, lists of up to chunk_size records are yielded instead of
+                single records.
+    
+    Returns
+    ----------
+    The generator return value (e.g. through <<yield from>>) is the AnnealingResult
+    of the run.
+    """
+
+    if recorder is None:
+        recorder = Trajectory(mode = 'none')
+    return _annealing(cooling, acceptance_prob, energy, move, interval, initial_temp, k_max,
+                      tolerance_value, tolerance_iter, obj_fn_limit, reann_tol, verbose, recorder,
+                      rng, observer, emit = True, chunk_size = chunk_size)
+
+
+StepRecord = namedtuple('StepRecord', ['k', 'state', 'energy', 'temperature', 'accepted', 'reann',
+                                       'best_energy', 'exit'])
+
+
+def _annealing(cooling, acceptance_prob, energy, move, interval, initial_temp, k_max,
+               tolerance_value, tolerance_iter, obj_fn_limit, reann_tol, verbose, recorder,
+               rng, observer, emit, chunk_size = None):
+
+    """
+    Annealing loop shared by <<simulated_annealing>> and <<iter_annealing>>.
+    With emit=False it never yields and the AnnealingResult is the generator return value.
     """
 
+    #Run statistics: the objective is timed call by call, clips are read from core_functions.
+    stats = RunStats()
+    start = time.perf_counter()
+    clips = core_functions.clip_events
+    clock = time.perf_counter
+
     #Step 1: generation of random starting point.
-    states = []
-    energies = []
-    temperatures = []
-   
-    exit_types = {
-        0 : 'Max Iter',
-        1 : 'Tolerance',
-        2 : 'Obj Limit',
-        3 : 'Temp Limit'
-        }
     k = 0
     reann = False
-    _exit = 0
+    _exit = None
+    chunk = []
     
     # Step 1: initialization of initial state and temperature.
 
-    s, T = initialization(initial_temp, interval)
+    rng = random_stream(rng)
+    s, T = initialization(initial_temp, interval, rng = rng)
+    if recorder is None:
+        recorder = Trajectory(dim = len(s))
+
+    #Energy of the current state: computed once and carried forward with s.
+    t = clock()
+    energy_s = energy(s)
+    objective_time = clock() - t
+    evaluations = 1
+    accepts = 0
+    rejects = 0
+
+    #Streaming window for the energy tolerance criterion.
+    tolerance_window = ToleranceWindow(tolerance_value, tolerance_iter)
+
+    #Best-so-far solution, updated incrementally at every step.
+    best_s = s
+    best_e = np.inf
     
+    dash = '-' * 70
     if verbose:
-        dash = '-' * 70
         print("\n")
         print ('{:_^70}'.format('Simulated Annealing'))
         print("Test function", energy)
@@ -110,10 +236,12 @@ def simulated_annealing(cooling, acceptance_prob, energy, move, interval, initia
         print("\n")
     
     
-    while True:
-        #it generates <infinte> iterations to be stopped two lines below if certain
+    while _exit is None:
+        #it generates <infinte> iterations to be stopped below if certain
         #conditions are met.
         k += 1
+        accepted = False
+        reannealed = False
         
         #Stopping criterion in case of max n.o. iterations is reached.
         if k == k_max :
@@ -121,69 +249,287 @@ def simulated_annealing(cooling, acceptance_prob, energy, move, interval, initia
                 print(dash)
                 print("MAX ITERATION EXIT")
                 print(dash)
-            break           
-        
-        #Step 2: move or generaton of new solution.
-        new_s = move(s, T, interval)
-        energy_s = energy(s)
-        energy_new_s = energy(new_s)
-        states.append(s)
-        energies.append(energy_s)
-        temperatures.append(T)
-        
-        #Step 3: application of Geometric cooling method.
-        T = cooling(T)
-        
-        #Stopping criteria for algorithm interruption and results presentation.
-        
-        #Temperature limit 
-        if T <= 0. :
-            if verbose :
-                print(dash)
-                print("TEMPERATURE EXIT")
-                print(dash)
-            _exit = 3
-            break   
-        
-       #Eneregy tolerance method, based on the average difference in energy
-       #computed for N iterations.
-        if tolerance(energies, tolerance_value, tolerance_iter) :
-            if verbose :
-                print(dash)
-                print("TOLERANCE EXIT")
-                print(dash)
-            _exit = 1
-            break    
+            _exit = 0
+
+        else :
+            #Step 2: move or generaton of new solution.
+            new_s = move(s, T, interval, rng)
+            t = clock()
+            energy_new_s = energy(new_s)
+            objective_time += clock() - t
+            evaluations += 1
+            recorder.record(s, energy_s, T)
+            if energy_s < best_e :
+                best_e = energy_s
+                best_s = s
+            
+            #Step 3: application of Geometric cooling method.
+            T = cooling(T)
+            
+            #Stopping criteria for algorithm interruption and results presentation.
+            
+            #Temperature limit 
+            if T <= 0. :
+                if verbose :
+                    print(dash)
+                    print("TEMPERATURE EXIT")
+                    print(dash)
+                _exit = 3
+            
+           #Eneregy tolerance method, based on the average difference in energy
+           #computed for N iterations.
+            elif tolerance_window.update(energy_s) :
+                if verbose :
+                    print(dash)
+                    print("TOLERANCE EXIT")
+                    print(dash)
+                _exit = 1
+            
+            #minimum value of free energy is reached.
+            elif objective_limit(energy_s, obj_fn_limit) :
+                if verbose :
+                    print(dash)
+                    print("OBJECTIVE FUNCTION LIMIT EXIT")
+                    print(dash)
+                _exit = 2
+            
+            #Reanniling Process if better solutions have been found along the way.
+            elif energy_s > best_e + reann_tol :
+                if verbose :
+                    print(dash)
+                    print("REANNILING")
+                    print(dash)
+                recorder.reset()
+                tolerance_window.reset()
+                s = best_s
+                energy_s = best_e
+                T = initial_temp
+                k = 0
+                reann = True
+                reannealed = True
+                stats.reanneals += 1
+                if observer is not None :
+                    observer.on_reanneal(k, s, energy_s)
+            
+            #Step 4: acceptance or rejection through comparison with acceptance probability.
+            elif acceptance_prob(energy_s, energy_new_s, T) >= rng.random() :
+                s = new_s
+                energy_s = energy_new_s
+                recorder.mark_accepted()
+                accepted = True
+                accepts += 1
+                if observer is not None :
+                    observer.on_accept(k, s, energy_s)
+
+            else :
+                rejects += 1
+                if observer is not None :
+                    observer.on_reject(k, new_s, energy_new_s)
+
+        if observer is not None :
+            observer.on_step(k, s, energy_s, T)
+
+        if emit :
+            step = StepRecord(k, s, energy_s, T, accepted, reannealed, best_e,
+                              None if _exit is None else exit_types[_exit])
+            if chunk_size is None :
+                yield step
+            else :
+                chunk.append(step)
+                if len(chunk) == chunk_size or _exit is not None :
+                    yield chunk
+                    chunk = []
+    
+    stats.evaluations = evaluations
+    stats.steps = evaluations - 1
+    stats.accepted = accepts
+    stats.rejected = rejects
+    stats.clips = core_functions.clip_events - clips
+    stats.objective_time = objective_time
+    stats.total_time = time.perf_counter() - start
+    if observer is not None :
+        observer.on_exit(exit_types[_exit], k, best_s, best_e)
+
+    return AnnealingResult(recorder.states, recorder.energies, recorder.temperatures, k, exit_types[_exit],
+                           reann, best_s, best_e, stats = stats)
+
+
+#------------------------------------------------------#
+#-------------Batched multi-chain algorithm------------#
+#------------------------------------------------------#
+
+class BatchResult(namedtuple('BatchResult', ['states', 'energies', 'best_states', 'best_energies',
+                                             'k', 'exit', 'reann', 'chain_steps', 'elapsed'])):
+    """
+    Outcome of <<simulated_annealing_batch>>: one entry per chain for every field
+    but chain_steps (total number of iterations performed by all chains) and 
+    elapsed (wall time in seconds).
+    """
+    __slots__ = ()
+
+    @property
+    def throughput(self):
+        """Chain-steps per second."""
+        return self.chain_steps / self.elapsed if self.elapsed > 0 else float('inf')
+
+
+def initialization_batch(initial_temp, interval, n_chains, dim = 2, rng = rnd):
+
+    lower, upper = bounds(interval, dim)
+    s = rng.uniform(lower, upper, size = (n_chains, len(lower)))
+    T = np.full(n_chains, float(initial_temp))
+
+    return s, T
+
+
+def simulated_annealing_batch(cooling, acceptance_prob, energy, move, interval, n_chains = 1000,
+                              initial_temp = 100., k_max = 1e10, tolerance_value = 1e-6, tolerance_iter = 10,
+                              obj_fn_limit = -1e10, reann_tol = 100, vectorized = False, rng = None):
+
+    """
+    N independent annealing chains are run in lockstep: states are kept in an (N, D)
+    array, energies and temperatures in (N,) vectors, so that proposal, clipping,
+    Boltzmann acceptance and cooling are whole-array operations per step.
+    
+    Every chain follows the very same procedure of <<simulated_annealing>> (stopping 
+    criteria, re-annealing towards its own best state) and stops on its own: finished
+    chains are frozen while the others keep going.
+    
+    Parameters
+    ----------
+    cooling: function
+             Cooling schedule acting element-wise on the temperatures (e.g. geom_cooling).
         
-        #minimum value of free energy is reached.
-        if objective_limit(energy_s, obj_fn_limit) :
-            if verbose :
-                print(dash)
-                print("OBJECTIVE FUNCTION LIMIT EXIT")
-                print(dash)
-            _exit = 2
-            break
+    acceptance_prob: function
+                     Vectorized acceptance probability (e.g. boltz_acceptance_prob_batch).
         
-        #Reanniling Process if better solutions have been found along the way.
-        best_e = min(energies)
-        best_s = states[np.argmin(energies)]
+    energy: function
+            Objective function of the state X.
         
-        if energy_s > best_e + reann_tol :
-            if verbose :
-                print(dash)
-                print("REANNILING")
-                print(dash)
-            energies = []
-            states = []
-            s = best_s
-            energy_s = best_e
-            T = initial_temp
-            k = 0
-            reann = True
-            continue
+    move: function
+          Vectorized move (e.g. boltz_move_batch).
         
-        #Step 4: acceptance or rejection through comparison with acceptance probability.
-        if acceptance_prob(energy_s, energy_new_s, T) >= rnd.random() :
-            s = new_s
+    interval: list-like
+              Estremes of a given interval, or per-dimension intervals.
     
-    return states, energies, temperatures, k, exit_types[_exit], reann
+    n_chains: int
+              Number of independent chains.
+              
+    initial_temp, k_max, tolerance_value, tolerance_iter, obj_fn_limit, reann_tol:
+              Same meaning as in <<simulated_annealing>>, applied to every chain.
+              
+    vectorized: bool
+                If True, energy is called once per step with coordinate arrays 
+                (energy(X) with X of shape (D, n)); otherwise it is called point by point.
+                
+    rng: numpy Generator, int or SeedSequence
+         Source of random numbers [default: the global numpy.random module].
+    
+    Returns
+    ----------
+    BatchResult with final states and energies, best states and energies, per-chain 
+    iterations, exit reasons and re-annealing flags, plus chain-steps and wall time.
+    """
+
+    def evaluate(points):
+        if vectorized:
+            return np.asarray(energy(points.T), dtype = float)
+        return np.fromiter((energy(p) for p in points), dtype = float, count = len(points))
+
+    start = time.perf_counter()
+
+    rng = random_stream(rng)
+    s, T = initialization_batch(initial_temp, interval, n_chains, rng = rng)
+    e = evaluate(s)
+    best_s = s.copy()
+    best_e = e.copy()
+
+    k = np.zeros(n_chains, dtype = np.int64)
+    _exit = np.zeros(n_chains, dtype = np.int64)
+    reann = np.zeros(n_chains, dtype = bool)
+    active = np.ones(n_chains, dtype = bool)
+
+    #Energy tolerance bookkeeping: ring buffer of the last absolute differences.
+    n_hist = np.zeros(n_chains, dtype = np.int64)
+    last_e = np.zeros(n_chains)
+    window = np.zeros((n_chains, tolerance_iter))
+    window_sum = np.zeros(n_chains)
+
+    chain_steps = 0
+    step = 0
+
+    while True:
+        idx = np.flatnonzero(active)
+        if idx.size == 0:
+            break
+        step += 1
+        k[idx] += 1
+
+        #Stopping criterion in case of max n.o. iterations is reached.
+        done = k[idx] == k_max
+        if done.any():
+            active[idx[done]] = False
+            idx = idx[~done]
+            if idx.size == 0:
+                break
+        chain_steps += idx.size
+
+        #Move or generation of new solutions.
+        new_s = move(s[idx], T[idx], interval, rng)
+        energy_s = e[idx]
+        energy_new_s = evaluate(new_s)
+
+        #History update (the same energies list of the scalar algorithm, as a window).
+        prev = idx[n_hist[idx] > 0]
+        if prev.size:
+            slot = (n_hist[prev] - 1) % tolerance_iter
+            diff = np.abs(e[prev] - last_e[prev])
+            window_sum[prev] += diff - window[prev, slot]
+            window[prev, slot] = diff
+        n_hist[idx] += 1
+        last_e[idx] = energy_s
+        if step % tolerance_iter == 0:
+            #resynchronization of the running sums against floating point drift
+            window_sum = window.sum(axis = 1)
+
+        #Cooling.
+        T[idx] = cooling(T[idx])
+
+        #Stopping criteria, in the same order as the scalar algorithm.
+        stop = np.zeros(idx.size, dtype = bool)
+        for code, crit in ((3, T[idx] <= 0.),
+                           (1, (n_hist[idx] > tolerance_iter) & (window_sum[idx] / tolerance_iter < tolerance_value)),
+                           (2, energy_s <= obj_fn_limit)):
+            crit = crit & ~stop
+            _exit[idx[crit]] = code
+            stop |= crit
+        active[idx[stop]] = False
+
+        #Best-so-far update.
+        better = energy_s < best_e[idx]
+        best_e[idx[better]] = energy_s[better]
+        best_s[idx[better]] = s[idx[better]]
+
+        #Reanniling Process.
+        back = ~stop & (energy_s > best_e[idx] + reann_tol)
+        if back.any():
+            r = idx[back]
+            s[r] = best_s[r]
+            e[r] = best_e[r]
+            T[r] = initial_temp
+            k[r] = 0
+            reann[r] = True
+            n_hist[r] = 0
+            window[r] = 0.
+            window_sum[r] = 0.
+
+        #Acceptance or rejection through comparison with acceptance probability.
+        go = ~stop & ~back
+        if go.any():
+            g = idx[go]
+            accept = acceptance_prob(energy_s[go], energy_new_s[go], T[g]) >= rng.random(g.size)
+            s[g[accept]] = new_s[go][accept]
+            e[g[accept]] = energy_new_s[go][accept]
+
+    return BatchResult(s, e, best_s, best_e, k, [exit_types[c] for c in _exit], reann,
+                       chain_steps, time.perf_counter() - start)
@@ -0,0 +1,186 @@
+"""
+Benchmark suite of the SA_algorithm.
+Microbenchmarks time the core functions and a fixed-length annealing loop,
+macrobenchmarks run every test function of Special_functions for a fixed number of
+iterations and seed. Results (steps per second and memory peak) are written as JSON
+and compared against a stored baseline: cases slower, or hungrier, than the baseline
+beyond a threshold are flagged as regressions.
+
+Usage:
+    > python benchmark.py --save-baseline     (store the reference numbers)
+    > python benchmark.py                     (compare against them)
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from numpy import random as rnd
+
+from algorithm import simulated_annealing
+from core_functions import avg_last_k_value, boltz_acceptance_prob, boltz_move, geom_cooling, tolerance
+from Special_functions import ackley_fn, himmelblau_fn, rastrigin_fn, rosenbrock_fn
+
+BASELINE = "benchmark_baseline.json"
+
+#Objectives of the macrobenchmarks and their domains, as in run.py
+test_conf = {
+    "Ackley" : [ackley_fn, (-6, 6)],
+    "Himmelblau" : [himmelblau_fn, (-6, 6)],
+    "Rastrigin" : [rastrigin_fn, (-5.12, 5.12)],
+    "Rosenbrock" : [rosenbrock_fn, (-6, 6)]
+    }
+
+
+def fixed_length_run(energy, interval, steps, seed = 42):
+    """
+    Annealing run of exactly <<steps>> iterations: tolerance, objective limit and
+    re-annealing are disabled, so that only k_max can stop the loop.
+    steps has to stay below ~14000, where geometric cooling from T=100 reaches 0.
+    """
+    return simulated_annealing(geom_cooling, boltz_acceptance_prob, energy, boltz_move, interval,
+                               k_max = steps + 1, tolerance_value = -1., obj_fn_limit = -np.inf,
+                               reann_tol = np.inf, rng = seed)
+
+
+def micro_cases(n):
+    """
+    It returns {name : (function, steps)}: every function performs <<steps>> elementary
+    operations of the benchmarked kind.
+    """
+    state = np.array([1., -2.])
+    energies = list(rnd.default_rng(0).random(1000))
+
+    def move():
+        for _ in range(n):
+            boltz_move(state, 1., (-6, 6))
+
+    def acceptance():
+        for i in range(n):
+            boltz_acceptance_prob(1., 1. + (i & 7), 10.)
+
+    def tolerance_check():
+        for _ in range(n // 100):
+            tolerance(energies, 1e-6, 1000)
+
+    def average():
+        for _ in range(n // 100):
+            avg_last_k_value(energies, 1000)
+
+    def loop():
+        fixed_length_run(ackley_fn, (-6, 6), n)
+
+    return {
+        "boltz_move" : (move, n),
+        "boltz_acceptance_prob" : (acceptance, n),
+        "tolerance" : (tolerance_check, n // 100),
+        "avg_last_k_value" : (average, n // 100),
+        "annealing_loop" : (loop, n)
+        }
+
+
+def macro_cases(n):
+    """
+    It returns {name : (function, steps)}, one fixed-length run per test function.
+    """
+    return {name : (lambda energy = energy, interval = interval : fixed_length_run(energy, interval, n), n)
+            for name, (energy, interval) in test_conf.items()}
+
+
+def measure(function, steps, repeat = 3):
+    """
+    Best steps per second over <<repeat>> timed calls, then memory peak (bytes) of
+    one more call traced by tracemalloc, which is kept out of the timings.
+    """
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"steps" : steps, "seconds" : best, "steps_per_sec" : steps / best, "peak_bytes" : peak}
+
+
+def run_benchmarks(micro_steps = 10000, macro_steps = 10000, repeat = 3):
+    """
+    It runs all the cases and returns the JSON-serializable report.
+    """
+    cases = {"micro." + name : case for name, case in micro_cases(micro_steps).items()}
+    cases.update({"macro." + name : case for name, case in macro_cases(macro_steps).items()})
+    return {
+        "meta" : {"python" : platform.python_version(), "numpy" : np.__version__,
+                  "machine" : platform.machine(), "repeat" : repeat},
+        "results" : {name : measure(function, steps, repeat) for name, (function, steps) in cases.items()}
+        }
+
+
+def compare(report, baseline, threshold = 0.2):
+    """
+    It returns the regressions of report with respect to baseline: cases whose steps per
+    second dropped, or whose memory peak grew, by more than threshold (relative).
+    Cases missing from either side are ignored.
+    """
+    regressions = []
+    for name, new in report["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        if new["steps_per_sec"] < old["steps_per_sec"] * (1 - threshold):
+            regressions.append({"case" : name, "metric" : "steps_per_sec",
+                                "baseline" : old["steps_per_sec"], "value" : new["steps_per_sec"]})
+        if new["peak_bytes"] > old["peak_bytes"] * (1 + threshold):
+            regressions.append({"case" : name, "metric" : "peak_bytes",
+                                "baseline" : old["peak_bytes"], "value" : new["peak_bytes"]})
+    return regressions
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Simulated Annealing benchmarks')
+    parser.add_argument('-b', '--baseline', default=BASELINE, type=str,
+                        help='Baseline JSON file. [default: "{}"]'.format(BASELINE))
+    parser.add_argument('-ma', '--macro_steps', default=10000, type=int,
+                        help='Iterations of every macrobenchmark. [default: 10000]')
+    parser.add_argument('-mi', '--micro_steps', default=10000, type=int,
+                        help='Operations of every microbenchmark. [default: 10000]')
+    parser.add_argument('-o', '--output', default=None, type=str,
+                        help='Output JSON file. [default: standard output]')
+    parser.add_argument('-r', '--repeat', default=3, type=int,
+                        help='Timed repetitions, the best one is kept. [default: 3]')
+    parser.add_argument('-s', '--save-baseline', action='store_true',
+                        help='Store the results as the new baseline.')
+    parser.add_argument('-th', '--threshold', default=0.2, type=float,
+                        help='Relative change flagged as a regression. [default: 0.2]')
+    args = parser.parse_args()
+
+    assert 100 <= args.micro_steps and 0 < args.macro_steps < 14000, "Insert values in the allowed range"
+    assert args.repeat > 0 and args.threshold >= 0, "Insert positive values"
+
+    report = run_benchmarks(args.micro_steps, args.macro_steps, args.repeat)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent = 2)
+    else:
+        try:
+            with open(args.baseline) as f:
+                report["regressions"] = compare(report, json.load(f), args.threshold)
+        except FileNotFoundError:
+            report["regressions"] = None
+
+    text = json.dumps(report, indent = 2)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(text)
+
+    #Non-zero exit status on regressions, e.g. to fail a CI job.
+    sys.exit(1 if report.get("regressions") else 0)
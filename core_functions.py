@@ -1,80 +1,289 @@
 """
 Operative functions to be run into the SA_algorithm.
-Creation of initial value, definition of 2-D movements and dedicated 
+Creation of initial value, definition of N-D movements and dedicated 
 domain boundaries conditions, optimization methods and stopping criteria 
 are listed below.
+States are numpy vectors of any length; the domain is either a single
+interval (a, b) shared by every coordinate or a sequence of per-dimension
+intervals [(a_1, b_1), ..., (a_N, b_N)].
 """
 
+import math
+from collections import OrderedDict
+
 import numpy as np
 from numpy import random as rnd
 
+#-------Random numbers----------#
+
+
+class BlockRandom:
+    """
+    Source of random numbers built on an injected numpy Generator.
+    Uniform numbers are pre-drawn in large blocks and handed out one at a time,
+    the block being refilled as it runs out: every call is much cheaper than a
+    call to the numpy.random module, while the sequence only depends on the seed
+    (not on the block size).
+    It exposes the random() and uniform() methods used by the core functions, so
+    that it can be passed wherever the numpy.random module is expected.
+    
+    Parameters
+    ----------
+    
+    generator: numpy Generator, int or SeedSequence
+               Generator to be wrapped, or seed for a new default one.
+               
+    block_size: int
+                Number of values drawn at once.
+    """
+
+    def __init__(self, generator = None, block_size = 8192):
+        if not isinstance(generator, np.random.Generator):
+            generator = np.random.default_rng(generator)
+        assert block_size > 0, "Block size needs to be a positive integer"
+        self.generator = generator
+        self.block_size = block_size
+        self._refill()
+
+    def _refill(self):
+        self._block = self.generator.random(self.block_size).tolist()
+        self._pos = 0
+
+    def random(self, size = None):
+        """
+        Uniform number(s) in [0, 1).
+        """
+        if size is None:
+            pos = self._pos
+            if pos == self.block_size:
+                self._refill()
+                pos = 0
+            self._pos = pos + 1
+            return self._block[pos]
+        n = int(np.prod(size))
+        out = np.empty(n)
+        filled = 0
+        while filled < n:
+            if self._pos == self.block_size:
+                self._refill()
+            take = min(n - filled, self.block_size - self._pos)
+            out[filled:filled + take] = self._block[self._pos:self._pos + take]
+            self._pos += take
+            filled += take
+        return out.reshape(size)
+
+    def uniform(self, low = 0., high = 1., size = None):
+        """
+        Uniform number(s) in [low, high), with array-like low and high broadcast together.
+        """
+        if size is None and isinstance(low, (int, float)) and isinstance(high, (int, float)):
+            return low + (high - low) * self.random()
+        low = np.asarray(low, dtype = float)
+        high = np.asarray(high, dtype = float)
+        if size is None:
+            size = np.broadcast(low, high).shape
+        return low + (high - low) * self.random(size)
+
+
+def random_stream(rng = None):
+    """
+    It returns the source of random numbers to be used by the algorithm:
+    the global numpy.random module if rng is None, a <<BlockRandom>> otherwise.
+    """
+    if rng is None or isinstance(rng, BlockRandom):
+        return rnd if rng is None else rng
+    return BlockRandom(rng)
+
+
+#-------Domain boundaries----------#
+
+
+def limits(interval):
+    """
+    It returns the lower and upper bounds of the domain: two floats for a single
+    interval (a, b), two arrays for per-dimension intervals.
+    """
+    if isinstance(interval[0], (int, float, np.integer)):
+        return interval[0], interval[1]
+    interval = np.asarray(interval, dtype = float)
+    return interval[:, 0], interval[:, 1]
+
+
+def bounds(interval, dim = 2):
+    """
+    It returns per-dimension lower and upper bounds as arrays; dim is only used
+    for a single interval (a, b) shared by every coordinate.
+    """
+    a, b = limits(interval)
+    if np.ndim(a) == 0:
+        return np.full(dim, float(a)), np.full(dim, float(b))
+    return a, b
+
+
 #-------Neighbour generation----------#
 
+#Number of coordinates brought back inside the domain by <<clip>> and <<clip_batch>>
+#since the module was loaded (read by the run statistics, see instrumentation.py).
+clip_events = 0
 
-def boltz_move(state, temp, interval):
+
+def boltz_move(state, temp, interval, rng = rnd):
     
     """
     The concept of "move" is here presented: the function defines the steps, whose
     magnitude and directions are expressed as the square root of <<current>> temperature
     and through random values of an uniform distribution respectively.
+    Every coordinate is moved at once, as a vector operation.
     
     Parameters
     ----------
     
-    new_state: list
-               It labels x and y axes.
+    state: numpy array
+           Current position, one entry per dimension.
                
     n: float
        Random index for move direction choice: positive for n<0.5, negative otherwise.
        
+    rng: numpy.random module or BlockRandom
+         Source of random numbers.
+       
     Returns
     ----------  
-    new_state: list
+    new_state: numpy array
                The actual position is updated to the new state after addition/subtraction operations. 
                The new state is inside the function domain (see <<clip>>).
     
     """
-    new_state = [0,0]
-    n = rnd.random()
+    state = np.asarray(state, dtype = float)
+    a,b = limits(interval)
+    n = rng.random()
+    #only the boundary in the direction of the move can be violated
     if n < 0.5 :
-        new_state[0] = state[0] + np.sqrt(temp)
-        new_state[1] = state[1] + np.sqrt(temp)
-        return (clip(new_state[0], interval, state[0]), 
-                clip(new_state[1], interval, state[1]))
+        new_state = state + math.sqrt(temp)
+        out = (new_state > b).any() if isinstance(b, np.ndarray) else new_state.max() > b
     else :
-        new_state[0] = state[0] - np.sqrt(temp)
-        new_state[1] = state[1] - np.sqrt(temp)
-        return (clip(new_state[0], interval, state[0]), 
-                clip(new_state[1], interval, state[1]))
+        new_state = state - math.sqrt(temp)
+        out = (new_state < a).any() if isinstance(a, np.ndarray) else new_state.min() < a
+    if out :
+        return clip(new_state, interval, state, rng)
+    return new_state
 
 
-def clip(x, interval, state):
+def clip(x, interval, state, rng = rnd):
     """
     <<Clip>> function allows for confinement of the moves inside the domain.   
     If x is not in interval, 
     return a point chosen uniformly at random between the violated boundary
     and the previous state; otherwise return x.
+    Arrays are clipped element-wise against their own per-dimension bounds.
     
     Parameters
     ----------
     
-    x: float
-       Number to be clipped.
+    x: float or numpy array
+       Number(s) to be clipped.
        
     interval: list-like
-              Estremes of a given interval.
+              Estremes of a given interval, or per-dimension intervals.
               
-    state: float
+    state: float or numpy array
            Current position
+           
+    rng: numpy.random module or BlockRandom
+         Source of random numbers.
+              
+    """
+    global clip_events
+    a,b = limits(interval)
+    if isinstance(x, (int, float)) :
+        if x < a :
+            clip_events += 1
+            return rng.uniform(a, state)    
+        if x > b :
+            clip_events += 1
+            return rng.uniform(state, b)    
+        else: 
+            return x
+    x = np.array(x, dtype = float)
+    state = np.asarray(state, dtype = float)
+    low = x < a
+    if low.any() :
+        clip_events += int(low.sum())
+        x[low] = rng.uniform(a[low] if isinstance(a, np.ndarray) else a, state[low])
+    high = x > b
+    if high.any() :
+        clip_events += int(high.sum())
+        x[high] = rng.uniform(state[high], b[high] if isinstance(b, np.ndarray) else b)
+    return x
+
+
+#-------Batched neighbour generation----------#
+
+
+def boltz_move_batch(states, temps, interval, rng = rnd):
+    """
+    Vectorized counterpart of <<boltz_move>> acting on N chains at once.
+    Every chain draws its own direction and steps all its coordinates by the square
+    root of its own temperature; out-of-domain coordinates are handled by <<clip_batch>>.
+    
+    Parameters
+    ----------
+    
+    states: numpy array
+            Current positions, shape (N, D).
+            
+    temps: numpy array
+           Current temperatures, shape (N,).
+           
+    interval: list-like
+              Estremes of a given interval, or per-dimension intervals.
+              
+    rng: numpy.random module or BlockRandom
+         Source of random numbers.
+              
+    Returns
+    ----------
+    new_states: numpy array
+                Proposed positions, shape (N, D), inside the function domain.
+    """
+    n = rng.random(len(states))
+    step = np.where(n < 0.5, 1., -1.) * np.sqrt(temps)
+    return clip_batch(states + step[:, None], interval, states, rng)
+
+
+def clip_batch(x, interval, state, rng = rnd):
+    """
+    Vectorized counterpart of <<clip>>: every entry of x outside the interval is
+    replaced by a point chosen uniformly at random between the violated boundary
+    and the corresponding entry of the previous state.
+    
+    Parameters
+    ----------
+    
+    x: numpy array
+       Coordinates to be clipped.
+       
+    interval: list-like
+              Estremes of a given interval, or per-dimension intervals.
               
+    state: numpy array
+           Current positions, same shape as x.
+           
+    rng: numpy.random module or BlockRandom
+         Source of random numbers.
     """
-    a,b = interval   
-    if x < a :
-        return rnd.uniform(a, state)    
-    if x > b :
-        return rnd.uniform(state, b)    
-    else: 
-        return x
+    global clip_events
+    a,b = limits(interval)
+    x = np.array(x, dtype = float)
+    low = x < a
+    if low.any() :
+        clip_events += int(low.sum())
+        x[low] = rng.uniform(np.broadcast_to(a, x.shape)[low], state[low])
+    high = x > b
+    if high.any() :
+        clip_events += int(high.sum())
+        x[high] = rng.uniform(state[high], np.broadcast_to(b, x.shape)[high])
+    return x
 
 #-----------Acceptance function--------------#
 
@@ -104,6 +313,27 @@ def boltz_acceptance_prob(energy, new_energy, temperature):
         return np.exp(- delta_e / temperature)
 
 
+def boltz_acceptance_prob_batch(energy, new_energy, temperature):
+    """
+    Vectorized counterpart of <<boltz_acceptance_prob>>: it returns, element-wise,
+    1 for downhill moves and exp(-delta_e/T) otherwise.
+    
+    Parameters
+    ----------
+    
+    energy: numpy array
+            Energies of the current states.
+            
+    new_energy: numpy array
+                Energies of the proposed states.
+                
+    temperature: numpy array
+                 Temperatures of the chains.
+    """
+    delta_e = np.maximum(new_energy - energy, 0.)
+    return np.exp(- delta_e / temperature)
+
+
 #-----------Cooling Procedure---------------#
 #Other cooling methods exist and can be found in references [1], [2]
 
@@ -142,6 +372,86 @@ def tolerance(energies, tolerance, tolerance_iter) :
         return False
     
 
+class SlidingWindow:
+    """
+    Fixed-size window over the last values of a stream, stored as a ring buffer
+    with a running sum: pushing a value and reading the window mean cost O(1).
+    The running sum is recomputed from scratch every time the buffer wraps around, so
+    that floating point drift does not build up along long runs.
+    It can be reused for any windowed stopping rule.
+    
+    Parameters
+    ----------
+    
+    size: int
+          Number of values taken into account.
+    """
+
+    def __init__(self, size):
+        assert size > 0, "Window size needs to be a positive integer"
+        self.size = size
+        self.reset()
+
+    def push(self, value):
+        pos = self._pos
+        self._sum += value - self._buffer[pos]
+        self._buffer[pos] = value
+        pos += 1
+        if pos == self.size:
+            pos = 0
+            #plain left-to-right sum, reproduced as it is by the JIT backend
+            total = 0.
+            for v in self._buffer:
+                total += v
+            self._sum = total
+        self._pos = pos
+        if self.count < self.size:
+            self.count += 1
+
+    @property
+    def full(self):
+        return self.count == self.size
+
+    def mean(self):
+        """
+        Average of the values currently in the window.
+        """
+        return self._sum / self.count if self.count else 0.
+
+    def reset(self):
+        self._buffer = [0.] * self.size
+        self._pos = 0
+        self._sum = 0.
+        self.count = 0
+
+
+class ToleranceWindow:
+    """
+    Streaming counterpart of <<tolerance>>: energies are pushed one at a time and 
+    the average of the last tolerance_iter absolute differences is kept up to date
+    in a <<SlidingWindow>>, giving the same stopping decision in O(1) per step.
+    """
+
+    def __init__(self, tolerance, tolerance_iter):
+        self.tolerance = tolerance
+        self.window = SlidingWindow(tolerance_iter)
+        self._last = None
+
+    def update(self, energy):
+        """
+        It adds the energy of the current iteration and returns True when the
+        tolerance criterion is satisfied.
+        """
+        if self._last is not None:
+            self.window.push(abs(energy - self._last))
+        self._last = energy
+        return self.window.full and self.window.mean() < self.tolerance
+
+    def reset(self):
+        self.window.reset()
+        self._last = None
+    
+
 def objective_limit(energy, limit):
     """
     The algorithm stops as soon as the current objective function value
@@ -162,3 +472,57 @@ def avg_last_k_value(energies, k):
     for i in range(L - 1,L - (k+1),-1):
         diff.append(abs(energies[i]-energies[i-1]))
     return np.mean(diff)
+
+
+#-----------Energy memoization------------#
+
+
+class EnergyCache:
+    """
+    Bounded LRU memoization layer around an energy function.
+    States are keyed on their coordinates tuple, so revisited points (e.g. after 
+    re-annealing towards the best state or after clipping) cost no evaluation.
+    Once maxsize entries are stored, the least recently used one is dropped.
+    
+    Parameters
+    ----------
+    
+    energy: function
+            Energy function to be memoized.
+            
+    maxsize: int
+             Max number of stored energies.
+    """
+
+    def __init__(self, energy, maxsize = 1024):
+        assert maxsize > 0, "Cache size needs to be a positive integer"
+        self.energy = energy
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+
+    def __call__(self, state):
+        key = state if type(state) is tuple else tuple(state)
+        cache = self._cache
+        if key in cache:
+            self.hits += 1
+            cache.move_to_end(key)
+            return cache[key]
+        self.misses += 1
+        value = self.energy(state)
+        cache[key] = value
+        if len(cache) > self.maxsize:
+            cache.popitem(last = False)
+        return value
+
+    def info(self):
+        """
+        It returns hits, misses and current size of the cache.
+        """
+        return {'hits' : self.hits, 'misses' : self.misses, 'size' : len(self._cache), 'maxsize' : self.maxsize}
+
+    def clear(self):
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,87 @@
+"""
+Instrumentation of the SA_algorithm.
+<<Observer>> is the callback interface notified by <<simulated_annealing>> on every
+step, acceptance, rejection, re-annealing and exit; <<RunStats>> collects the built-in
+counters of a run (energy evaluations, accepted and rejected moves, clip events,
+re-annealings) and splits the wall time between the objective function and the
+engine overhead, without the need of an external profiler.
+"""
+
+
+class Observer:
+    """
+    Base class of the annealing observers: every callback does nothing, subclasses
+    override only those they need. Callbacks are invoked from inside the loop, so
+    they should be cheap.
+
+    Order of the notifications within an iteration: on_accept / on_reject / on_reanneal
+    (at most one of them), then on_step; on_exit is called once, at the end of the run.
+    """
+
+    def on_step(self, k, state, energy, temperature):
+        """End of iteration k: current state, its energy and the temperature."""
+
+    def on_accept(self, k, state, energy):
+        """The proposed state was accepted and became the current state."""
+
+    def on_reject(self, k, state, energy):
+        """The proposed state (with its energy) was rejected."""
+
+    def on_reanneal(self, k, state, energy):
+        """Re-annealing: the search restarts from the best state at the initial temperature."""
+
+    def on_exit(self, exit, k, best_state, best_energy):
+        """The run stopped because of the <<exit>> criterion."""
+
+
+class RunStats:
+    """
+    Counters of an annealing run.
+
+    evaluations: calls to the objective function (initial state included);
+    steps: iterations performed over the whole run (they are not reset by re-annealing);
+    accepted, rejected: outcome of the acceptance test;
+    clips: coordinates brought back inside the domain by <<clip>>;
+    reanneals: number of re-annealings;
+    objective_time, total_time: seconds spent inside the objective function and in the
+    whole run; the difference is the engine overhead.
+    """
+
+    __slots__ = ('evaluations', 'steps', 'accepted', 'rejected', 'clips', 'reanneals',
+                 'objective_time', 'total_time')
+
+    def __init__(self):
+        self.evaluations = 0
+        self.steps = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.clips = 0
+        self.reanneals = 0
+        self.objective_time = 0.
+        self.total_time = 0.
+
+    @property
+    def overhead_time(self):
+        """Seconds spent by the engine outside the objective function."""
+        return self.total_time - self.objective_time
+
+    @property
+    def objective_fraction(self):
+        """Share of the wall time spent inside the objective function."""
+        return self.objective_time / self.total_time if self.total_time > 0 else 0.
+
+    @property
+    def acceptance_rate(self):
+        decisions = self.accepted + self.rejected
+        return self.accepted / decisions if decisions else 0.
+
+    def as_dict(self):
+        stats = {name : getattr(self, name) for name in self.__slots__}
+        stats['overhead_time'] = self.overhead_time
+        return stats
+
+    def __repr__(self):
+        return ("RunStats(evaluations={}, steps={}, accepted={}, rejected={}, clips={}, reanneals={}, "
+                "objective_time={:.4g}s, overhead_time={:.4g}s)".format(
+                    self.evaluations, self.steps, self.accepted, self.rejected, self.clips,
+                    self.reanneals, self.objective_time, self.overhead_time))
@@ -0,0 +1,319 @@
+"""
+Optional accelerated backend of the SA_algorithm.
+The whole annealing loop (Boltzmann move with clipping, Geometric cooling,
+Boltzmann acceptance, stopping criteria and re-annealing) is fused into a single
+kernel working on scalars and preallocated arrays, which is compiled with numba
+when it is installed.
+Random numbers are read from the very same stream used by <<simulated_annealing>>,
+so that for a fixed seed the two paths visit the same states.
+If numba is not available, or the configuration is not supported by the kernel,
+<<simulated_annealing_jit>> falls back to the pure-Python algorithm.
+"""
+
+import functools
+
+import numpy as np
+
+import algorithm as ag
+from core_functions import boltz_acceptance_prob, boltz_move, geom_cooling, limits, random_stream
+from Special_functions import ackley_fn, himmelblau_fn, rastrigin_fn, rosenbrock_fn
+from trajectory import Trajectory, record_modes
+import user_function
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def _jit(function):
+    return numba.njit(cache = True)(function) if numba is not None else function
+
+
+#------------Scalar objectives----------
+#Same expressions of Special_functions.py, written on the two coordinates.
+
+def _ackley(x, y):
+    exp1 = np.exp(-0.2 * np.sqrt(0.5 * (x**2 + y**2)))
+    exp2 = np.exp(0.5 * (np.cos(2 * np.pi * x) + np.cos(2 * np.pi * y)))
+    return -20 * exp1 - exp2 + np.e + 20
+
+
+def _himmelblau(x, y):
+    return np.square(x**2 + y - 11) + np.square(x + y**2 - 7)
+
+
+def _rastrigin(x, y):
+    return 20 + x**2 + y**2 - 10 * (np.cos(2 * np.pi * x) + np.cos(2 * np.pi * y))
+
+
+def _rosenbrock(x, y):
+    return np.square(1 - x) + 100 * np.square(y - x**2)
+
+
+objectives = {
+    ackley_fn : _ackley,
+    himmelblau_fn : _himmelblau,
+    rastrigin_fn : _rastrigin,
+    rosenbrock_fn : _rosenbrock,
+    user_function.chosen_function : user_function.formula
+    }
+
+
+#------------Fused kernel----------
+
+#kernel exit status
+_DONE = 0
+_NEED_RANDOM = 1
+_NEED_SPACE = 2
+
+#random numbers needed at most by one iteration: direction, two clips, acceptance
+_MAX_DRAWS = 4
+
+
+def _anneal_kernel(objective, st, it, window, u, upos, rec_s, rec_e, rec_t, rec_a, lo, hi, pf, pi):
+    """
+    Annealing loop on a 2-D state. The loop state is kept in st (floats) and it (integers)
+    so that the kernel can return whenever it runs out of random numbers or recording
+    space, and be resumed after the caller has refilled them.
+    It returns the exit status and the position reached in the random numbers buffer.
+    """
+    x = st[0]; y = st[1]; e = st[2]; T = st[3]
+    bx = st[4]; by = st[5]; be = st[6]
+    wsum = st[7]; last_e = st[8]; best_rec = st[9]
+    k = it[0]; reann = it[1]; _exit = it[2]; wpos = it[3]
+    wcount = it[4]; has_last = it[5]; n_rec = it[6]; calls = it[7]
+    T0 = pf[0]; alpha = pf[1]; tol_value = pf[2]; obj_limit = pf[3]; reann_tol = pf[4]; k_max = pf[5]
+    ti = pi[0]; mode = pi[1]; every = pi[2]
+    cap = rec_e.shape[0]
+    n_u = u.shape[0]
+    status = _DONE
+
+    while _exit < 0:
+        if n_u - upos < _MAX_DRAWS:
+            status = _NEED_RANDOM
+            break
+        if mode != 3 and n_rec == cap:
+            status = _NEED_SPACE
+            break
+
+        k += 1
+        if k == k_max:
+            _exit = 0
+            break
+
+        #Boltzmann move with clipping (see boltz_move and clip).
+        step = np.sqrt(T)
+        n = u[upos]
+        upos += 1
+        if n < 0.5:
+            nx = x + step
+            ny = y + step
+            if nx > hi[0]:
+                nx = x + (hi[0] - x) * u[upos]
+                upos += 1
+            if ny > hi[1]:
+                ny = y + (hi[1] - y) * u[upos]
+                upos += 1
+        else:
+            nx = x - step
+            ny = y - step
+            if nx < lo[0]:
+                nx = lo[0] + (x - lo[0]) * u[upos]
+                upos += 1
+            if ny < lo[1]:
+                ny = lo[1] + (y - lo[1]) * u[upos]
+                upos += 1
+        en = objective(nx, ny)
+
+        #Recording (see Trajectory.record).
+        calls += 1
+        recorded = False
+        if mode == 0 or (mode == 1 and (calls - 1) % every == 0) or (mode == 2 and e < best_rec):
+            if mode == 2:
+                best_rec = e
+            rec_s[n_rec, 0] = x
+            rec_s[n_rec, 1] = y
+            rec_e[n_rec] = e
+            rec_t[n_rec] = T
+            rec_a[n_rec] = False
+            n_rec += 1
+            recorded = True
+        if e < be:
+            be = e
+            bx = x
+            by = y
+
+        #Geometric cooling.
+        T = T * alpha
+
+        #Stopping criteria, tolerance window (see ToleranceWindow) and re-annealing.
+        if T <= 0.:
+            _exit = 3
+            break
+        full = False
+        if has_last:
+            v = abs(e - last_e)
+            wsum += v - window[wpos]
+            window[wpos] = v
+            wpos += 1
+            if wpos == ti:
+                wpos = 0
+                wsum = 0.
+                for j in range(ti):
+                    wsum += window[j]
+            if wcount < ti:
+                wcount += 1
+            full = wcount == ti
+        last_e = e
+        has_last = 1
+        if full and wsum / wcount < tol_value:
+            _exit = 1
+            break
+        if e <= obj_limit:
+            _exit = 2
+            break
+        if e > be + reann_tol:
+            n_rec = 0
+            calls = 0
+            best_rec = np.inf
+            window[:] = 0.
+            wpos = 0
+            wsum = 0.
+            wcount = 0
+            has_last = 0
+            x = bx
+            y = by
+            e = be
+            T = T0
+            k = 0
+            reann = 1
+            continue
+
+        #Boltzmann acceptance.
+        delta_e = en - e
+        if delta_e < 0:
+            p = 1.
+        else:
+            p = np.exp(- delta_e / T)
+        r = u[upos]
+        upos += 1
+        if p >= r:
+            x = nx
+            y = ny
+            e = en
+            if recorded:
+                rec_a[n_rec - 1] = True
+
+    st[0] = x; st[1] = y; st[2] = e; st[3] = T
+    st[4] = bx; st[5] = by; st[6] = be
+    st[7] = wsum; st[8] = last_e; st[9] = best_rec
+    it[0] = k; it[1] = reann; it[2] = _exit; it[3] = wpos
+    it[4] = wcount; it[5] = has_last; it[6] = n_rec; it[7] = calls
+    return status, upos
+
+
+_kernel = _jit(_anneal_kernel) if numba is not None else None
+_compiled = {}
+
+
+def _cooling_alpha(cooling):
+    """
+    Geometric ratio of the cooling schedule, None if it is not geometric cooling.
+    """
+    if cooling is geom_cooling:
+        return 0.95
+    if (isinstance(cooling, functools.partial) and cooling.func is geom_cooling and not cooling.args
+            and set(cooling.keywords) == {'alpha'}):
+        return cooling.keywords['alpha']
+    return None
+
+
+def supported(cooling, acceptance_prob, energy, move, interval, verbose = False):
+    """
+    It tells whether the configuration can be run by the fused kernel: built-in
+    objectives, Geometric cooling, Boltzmann acceptance and move on 2-D states.
+    """
+    if energy not in objectives or acceptance_prob is not boltz_acceptance_prob or move is not boltz_move:
+        return False
+    if _cooling_alpha(cooling) is None or verbose:
+        return False
+    lo, hi = limits(interval)
+    return np.size(lo) in (1, 2) and np.size(hi) in (1, 2)
+
+
+def available():
+    return _kernel is not None
+
+
+def _run(kernel, objective, cooling, interval, initial_temp, k_max, tolerance_value, tolerance_iter,
+         obj_fn_limit, reann_tol, recorder, rng, block_size = 65536):
+    """
+    It drives the kernel: initialization with the same random numbers used by the
+    Python path, refills of the random numbers and recording buffers, collection
+    of the results.
+    """
+    rng = random_stream(rng)
+    s, T = ag.initialization(initial_temp, interval, rng = rng)
+    x, y = float(s[0]), float(s[1])
+    e = float(objective(x, y))
+    if recorder is None:
+        recorder = Trajectory()
+    assert recorder.mode in record_modes
+
+    lo, hi = limits(interval)
+    lo = np.broadcast_to(np.asarray(lo, dtype = float), (2,)).copy()
+    hi = np.broadcast_to(np.asarray(hi, dtype = float), (2,)).copy()
+    st = np.array([x, y, e, float(T), x, y, np.inf, 0., 0., np.inf])
+    it = np.array([0, 0, -1, 0, 0, 0, 0, 0], dtype = np.int64)
+    window = np.zeros(int(tolerance_iter))
+    pf = np.array([float(initial_temp), float(_cooling_alpha(cooling)), float(tolerance_value),
+                   float(obj_fn_limit), float(reann_tol), float(k_max)])
+    pi = np.array([int(tolerance_iter), record_modes.index(recorder.mode), recorder.every], dtype = np.int64)
+
+    cap = 1024 if recorder.mode != 'none' else 1
+    rec_s = np.empty((cap, 2))
+    rec_e = np.empty(cap)
+    rec_t = np.empty(cap)
+    rec_a = np.zeros(cap, dtype = np.bool_)
+
+    u = np.asarray(rng.random(block_size), dtype = float)
+    upos = 0
+    while True:
+        status, upos = kernel(objective, st, it, window, u, upos, rec_s, rec_e, rec_t, rec_a, lo, hi, pf, pi)
+        if status == _DONE:
+            break
+        if status == _NEED_RANDOM:
+            u = np.concatenate((u[upos:], rng.random(block_size)))
+            upos = 0
+        else:
+            n = len(rec_e)
+            rec_s = np.concatenate((rec_s, np.empty((n, 2))))
+            rec_e = np.concatenate((rec_e, np.empty(n)))
+            rec_t = np.concatenate((rec_t, np.empty(n)))
+            rec_a = np.concatenate((rec_a, np.zeros(n, dtype = np.bool_)))
+
+    n_rec = it[6]
+    recorder.reset()
+    recorder.extend(rec_s[:n_rec], rec_e[:n_rec], rec_t[:n_rec], rec_a[:n_rec])
+    return ag.AnnealingResult(recorder.states, recorder.energies, recorder.temperatures, int(it[0]),
+                              ag.exit_types[int(it[2])], bool(it[1]), np.array(st[4:6]), st[6])
+
+
+def simulated_annealing_jit(cooling, acceptance_prob, energy, move, interval, initial_temp = 100.,
+                            k_max = 1e10, tolerance_value = 1e-6, tolerance_iter = 10,
+                            obj_fn_limit = -1e10, reann_tol = 100, verbose = False, recorder = None,
+                            rng = None):
+    """
+    Drop-in replacement of <<simulated_annealing>> (same parameters and AnnealingResult)
+    running the fused compiled kernel whenever numba is installed and the configuration
+    is <<supported>>; otherwise the pure-Python algorithm is run.
+    """
+    if not available() or not supported(cooling, acceptance_prob, energy, move, interval, verbose):
+        return ag.simulated_annealing(cooling, acceptance_prob, energy, move, interval, initial_temp,
+                                      k_max, tolerance_value, tolerance_iter, obj_fn_limit, reann_tol,
+                                      verbose, recorder, rng)
+    if energy not in _compiled:
+        _compiled[energy] = _jit(objectives[energy])
+    return _run(_kernel, _compiled[energy], cooling, interval, initial_temp, k_max,
+                tolerance_value, tolerance_iter, obj_fn_limit, reann_tol, recorder, rng)
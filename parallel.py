@@ -0,0 +1,101 @@
+"""
+Parallel execution of the SA_algorithm.
+Test functions and random restarts are spread across a pool of worker processes:
+every (function, restart) pair is an independent task with its own seed, spawned
+from a single numpy SeedSequence so that the whole suite is reproducible no matter
+how tasks are scheduled among the workers.
+"""
+
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import algorithm as ag
+import jit_backend
+
+
+def task_seeds(seed, n_tasks):
+    """
+    It returns n_tasks independent seeds spawned from a SeedSequence.
+    """
+    return np.random.SeedSequence(seed).spawn(n_tasks)
+
+
+backends = {
+    'python' : ag.simulated_annealing,
+    'jit' : jit_backend.simulated_annealing_jit
+    }
+
+
+def _run_task(energy, interval, parameters, seed, backend = 'python'):
+    """
+    Single annealing run, executed inside a worker process with its own Generator.
+    """
+    parameters = copy.deepcopy(parameters)
+    return backends[backend](energy = energy, interval = interval, rng = seed, **parameters)
+
+
+def run_suite(test_conf, parameters, restarts = 1, workers = None, seed = None, backend = 'python'):
+    """
+    It runs <<simulated_annealing>> on every function of test_conf, restarts times
+    each, on a pool of worker processes.
+
+    Parameters
+    ----------
+    test_conf: dict
+               {name : [energy, interval]}, the same configuration used by run.py.
+               Energies must be picklable (i.e. module level functions).
+
+    parameters: dict
+                Remaining keyword arguments of <<simulated_annealing>> (cooling,
+                acceptance_prob, move, initial_temp, ...).
+
+    restarts: int
+              Number of independent random restarts per function.
+
+    workers: int
+             Number of worker processes [default: number of CPUs]; with 1 worker
+             tasks are run in the calling process.
+
+    seed: int
+          Root seed of the SeedSequence [default: fresh entropy].
+
+    backend: str
+             'python' or 'jit' (fused numba kernel, see jit_backend.py) [default: 'python'].
+
+    Returns
+    ----------
+    results: dict
+             {name : [AnnealingResult of every restart]}
+    """
+    assert restarts > 0, "Insert positive values"
+    if workers is None:
+        workers = os.cpu_count() or 1
+    assert workers > 0, "Insert positive values"
+    assert backend in backends, "Backend must be one of {}".format(tuple(backends))
+
+    tasks = [(name, energy, interval) for name, (energy, interval) in test_conf.items()
+             for _ in range(restarts)]
+    seeds = task_seeds(seed, len(tasks))
+    results = {name : [] for name in test_conf}
+
+    if workers == 1:
+        for (name, energy, interval), task_seed in zip(tasks, seeds):
+            results[name].append(_run_task(energy, interval, parameters, task_seed, backend))
+        return results
+
+    with ProcessPoolExecutor(max_workers = min(workers, len(tasks))) as executor:
+        futures = [executor.submit(_run_task, energy, interval, parameters, task_seed, backend)
+                   for (name, energy, interval), task_seed in zip(tasks, seeds)]
+        for (name, _, _), future in zip(tasks, futures):
+            results[name].append(future.result())
+    return results
+
+
+def best_results(results):
+    """
+    It returns, for every function, the restart with the lowest best energy.
+    """
+    return {name : min(runs, key = lambda run : run.best_energy) for name, runs in results.items()}
@@ -1,20 +1,102 @@
 
+import hashlib
+import inspect
+import os
+
 import matplotlib.pyplot as plt
 import numpy as np
-from test_functions import ackley_fn, himmelblau_fn, rastrigin_fn, rosenbrock_fn
-from my_function import chosen_function
+from core_functions import limits
+from Special_functions import ackley_fn, himmelblau_fn, rastrigin_fn, rosenbrock_fn
+from user_function import chosen_function, INTERVAL
+
+#Folder of the cached landscape grids, None to disable caching
+LANDSCAPE_CACHE = ".landscape_cache"
+
+
+def _grid_key(energy, interval, resolution):
+    """
+    Cache key of a landscape grid: function name, a digest of the source file it is
+    defined in (so that editing user_function.py invalidates its grid), interval
+    and resolution.
+    """
+    digest = hashlib.sha1()
+    try:
+        with open(inspect.getsourcefile(energy), 'rb') as f:
+            digest.update(f.read())
+    except (TypeError, OSError):
+        pass
+    a, b = limits(interval)
+    digest.update(repr((energy.__module__, energy.__qualname__, np.ravel(a).tolist(),
+                        np.ravel(b).tolist(), int(resolution))).encode())
+    return "{}_{}".format(energy.__name__, digest.hexdigest()[:16])
+
+
+def landscape_grid(energy, interval, resolution = 120, cache_dir = LANDSCAPE_CACHE):
+    """
+    Energy landscape on a resolution x resolution grid covering the interval.
+    
+    All grid points are evaluated in one batch, energy(X) with X of shape (2, n, n)
+    built with meshgrid; functions that do not accept arrays are evaluated point by 
+    point instead. Grids are cached in cache_dir as .npz files keyed by function,
+    interval and resolution, so that repeated runs skip the evaluation.
+    
+    Parameters
+    ----------
+    
+    energy: function
+            Objective function of X = (x,y).
+            
+    interval: list-like
+              Estremes of a given interval, or per-dimension intervals.
+              
+    resolution: int
+                Number of grid points per axis.
+                
+    cache_dir: str
+               Folder of the cached grids; None disables caching.
+    
+    Returns
+    ----------
+    X, Y, Z: numpy arrays
+             Coordinates and energies of the grid points, shape (resolution, resolution).
+    """
+    assert resolution > 1, "Insert values greater than 1"
+    path = None
+    if cache_dir is not None:
+        path = os.path.join(cache_dir, _grid_key(energy, interval, resolution) + ".npz")
+        if os.path.exists(path):
+            with np.load(path) as grid:
+                return grid['X'], grid['Y'], grid['Z']
+
+    a, b = limits(interval)
+    a, b = np.broadcast_to(a, (2,)), np.broadcast_to(b, (2,))
+    X, Y = np.meshgrid(np.linspace(a[0], b[0], resolution), np.linspace(a[1], b[1], resolution), indexing = 'ij')
+    try:
+        Z = np.asarray(energy(np.stack((X, Y))), dtype = float)
+        assert Z.shape == X.shape
+    except Exception:
+        Z = np.array([energy((x, y)) for x, y in zip(X.ravel(), Y.ravel())], dtype = float).reshape(X.shape)
+
+    if path is not None:
+        os.makedirs(cache_dir, exist_ok = True)
+        tmp = path + ".tmp"
+        with open(tmp, 'wb') as f:
+            np.savez(f, X = X, Y = Y, Z = Z)
+        os.replace(tmp, path)
+    return X, Y, Z
+
 
 """
 The following functions are identical in parameters and working principle.
 Separation is aimed to give easy access for the users to the chosen_function plot 
 code lines if they want to change settings.
-They generate specific points via for loop once a dedicated range is selected arbitrarily.
+They generate the landscapes through <<landscape_grid>> once a dedicated range is selected.
 For test functions, actual local minima are black-labelled and reported in results plots: they 
 show how far the algorithm is from exact solutions.
 """
 
 
-def plot_results_myfunction(results):
+def plot_results_myfunction(results, resolution = 120, cache_dir = LANDSCAPE_CACHE):
     """
     Generation of selected 2-variables functions points.
     
@@ -29,28 +111,25 @@ def plot_results_myfunction(results):
     ----------
     
     results: list
-             This is actually a list of lists of the form
-             results[function]=[[state],[energy],[temperature]] 
-             where state=(x,y); energy is a function of (x,y) and temperature is the
+             This is actually a list of arrays of the form
+             results[function]=[states, energies, temperatures] 
+             where states has shape (n,2); energy is a function of (x,y) and temperature is the
              temperature at which the scalar of energy is evaluated.
+             
+    resolution, cache_dir:
+             Grid points per axis and cache folder of the landscapes (see landscape_grid).
     
     """
    #Generate chosen function points
-    function={"chosen_function":[[],[],[]]}
-    
-    for i in range (-60, 60):
-        for j in range (-60,60):
-            function['chosen_function'][0].append(i/10)
-            function['chosen_function'][1].append(j/10)
-            function['chosen_function'][2].append(chosen_function((i/10, j/10)))
+    function = {"chosen_function" : landscape_grid(chosen_function, INTERVAL, resolution, cache_dir)}
 
     fig = plt.figure( figsize = (20,10))
     
     #Chosen function is created as a single 3-dimensional plot. No operations performed yet.
     ax5 = fig.add_subplot(111, projection='3d', title = 'chosen_function')
-    xs = function['chosen_function'][0]
-    ys = function['chosen_function'][1]
-    zs = function['chosen_function'][2]
+    xs = function['chosen_function'][0].ravel()
+    ys = function['chosen_function'][1].ravel()
+    zs = function['chosen_function'][2].ravel()
     ax5.scatter(xs, ys, zs, marker='o')
     ax5.set_xlabel('x')
     ax5.set_ylabel('y')
@@ -61,9 +140,9 @@ def plot_results_myfunction(results):
     #Organize the results of performance test
     
     #Chosen function
-    my_points = np.array(results['chosen_function'][0])
-    my_energy = np.array(results['chosen_function'][1])
-    my_temp = np.array(results['chosen_function'][2])
+    my_points = np.asarray(results['chosen_function'][0])
+    my_energy = np.asarray(results['chosen_function'][1])
+    my_temp = np.asarray(results['chosen_function'][2])
     
     #-----------results pics----------#
 
@@ -88,7 +167,7 @@ def plot_results_myfunction(results):
     plt.show()
 
 
-def plot_results_tests(results):
+def plot_results_tests(results, resolution = 120, cache_dir = LANDSCAPE_CACHE):
     """
     Generation of selected 2-variables functions points.
     
@@ -102,52 +181,32 @@ def plot_results_tests(results):
     Parameters
     ----------
     results: list
-             This is actually a list of lists of the form
-             results[function]=[[state],[energy],[temperature]] 
-             where state=(x,y); energy is a function of (x,y) and temperature is the
+             This is actually a list of arrays of the form
+             results[function]=[states, energies, temperatures] 
+             where states has shape (n,2); energy is a function of (x,y) and temperature is the
              temperature at which the scalar of energy is evaluated.
+             
+    resolution, cache_dir:
+             Grid points per axis and cache folder of the landscapes (see landscape_grid).
     
     """
     
      #--------Test functions plots---------#
     #Generate functions points
     functions = {
-                "Ackley" : [[],[],[]],
-                "Himmelblau" : [[],[],[]],
-                "Rastrigin" : [[],[],[]],
-                "Rosenbrock" : [[],[],[]]               
+                "Ackley" : landscape_grid(ackley_fn, (-6, 6), resolution, cache_dir),
+                "Himmelblau" : landscape_grid(himmelblau_fn, (-6, 6), resolution, cache_dir),
+                "Rastrigin" : landscape_grid(rastrigin_fn, (-5.12, 5.12), resolution, cache_dir),
+                "Rosenbrock" : landscape_grid(rosenbrock_fn, (-6, 6), resolution, cache_dir)
                 }
 
-    for i in range(-60, 60):
-        for j in range(-60, 60):
-            functions['Ackley'][0].append(i/10)
-            functions['Ackley'][1].append(j/10)
-            functions['Ackley'][2].append(ackley_fn((i/10, j/10)))
-            
-            functions['Himmelblau'][0].append(i/10)
-            functions['Himmelblau'][1].append(j/10)
-            functions['Himmelblau'][2].append(himmelblau_fn((i/10, j/10)))
-                    
-            functions['Rosenbrock'][0].append(i/10)
-            functions['Rosenbrock'][1].append(j/10)
-            functions['Rosenbrock'][2].append(rosenbrock_fn((i/10, j/10)))
-            
-            
-
-    for i in range(-512, 512, 10):
-        for j in range(-512, 512, 10):
-                    
-            functions['Rastrigin'][0].append(i/100)
-            functions['Rastrigin'][1].append(j/100)
-            functions['Rastrigin'][2].append(rastrigin_fn((i/100, j/100)))
-
     fig = plt.figure( figsize = (20,10))
 
     #Ackley function
     ax1 = fig.add_subplot(221, projection='3d', title = 'Ackley')
-    xs = functions['Ackley'][0]
-    ys = functions['Ackley'][1]
-    zs = functions['Ackley'][2]
+    xs = functions['Ackley'][0].ravel()
+    ys = functions['Ackley'][1].ravel()
+    zs = functions['Ackley'][2].ravel()
     ax1.scatter(xs, ys, zs, marker='o')
     ax1.set_xlabel('x')
     ax1.set_ylabel('y')
@@ -155,9 +214,9 @@ def plot_results_tests(results):
 
     #Himmelblau function
     ax2 = fig.add_subplot(222, projection='3d', title = 'Himmelblau')
-    xs = functions['Himmelblau'][0]
-    ys = functions['Himmelblau'][1]
-    zs = functions['Himmelblau'][2]
+    xs = functions['Himmelblau'][0].ravel()
+    ys = functions['Himmelblau'][1].ravel()
+    zs = functions['Himmelblau'][2].ravel()
     ax2.scatter(xs, ys, zs, marker='o')
     ax2.set_xlabel('x')
     ax2.set_ylabel('y')
@@ -165,9 +224,9 @@ def plot_results_tests(results):
 
     #Rastrigin function
     ax3 = fig.add_subplot(223, projection='3d', title = 'Rastrigin')
-    xs = functions['Rastrigin'][0]
-    ys = functions['Rastrigin'][1]
-    zs = functions['Rastrigin'][2]
+    xs = functions['Rastrigin'][0].ravel()
+    ys = functions['Rastrigin'][1].ravel()
+    zs = functions['Rastrigin'][2].ravel()
     ax3.scatter(xs, ys, zs, marker='o')
     ax3.set_xlabel('x')
     ax3.set_ylabel('y')
@@ -175,9 +234,9 @@ def plot_results_tests(results):
 
     #Rosenbrock function
     ax4 = fig.add_subplot(224, projection='3d', title = 'Rosenbrock')
-    xs = functions['Rosenbrock'][0]
-    ys = functions['Rosenbrock'][1]
-    zs = functions['Rosenbrock'][2]
+    xs = functions['Rosenbrock'][0].ravel()
+    ys = functions['Rosenbrock'][1].ravel()
+    zs = functions['Rosenbrock'][2].ravel()
     ax4.scatter(xs, ys, zs, marker='o')
     ax4.set_xlabel('x')
     ax4.set_ylabel('y')
@@ -191,24 +250,24 @@ def plot_results_tests(results):
     #Organize the results of the performance tests
 
     #Ackley
-    ackley_points = np.array(results['Ackley'][0])
-    ackley_energy = np.array(results['Ackley'][1])
-    ackley_temp = np.array(results['Ackley'][2])
+    ackley_points = np.asarray(results['Ackley'][0])
+    ackley_energy = np.asarray(results['Ackley'][1])
+    ackley_temp = np.asarray(results['Ackley'][2])
 
     #Himmelblau
-    himm_points = np.array(results['Himmelblau'][0])
-    himm_energy = np.array(results['Himmelblau'][1])
-    himm_temp = np.array(results['Himmelblau'][2])
+    himm_points = np.asarray(results['Himmelblau'][0])
+    himm_energy = np.asarray(results['Himmelblau'][1])
+    himm_temp = np.asarray(results['Himmelblau'][2])
 
     #Rastrigin
-    rastr_points = np.array(results['Rastrigin'][0])
-    rastr_energy = np.array(results['Rastrigin'][1])
-    rastr_temp = np.array(results['Rastrigin'][2])
+    rastr_points = np.asarray(results['Rastrigin'][0])
+    rastr_energy = np.asarray(results['Rastrigin'][1])
+    rastr_temp = np.asarray(results['Rastrigin'][2])
 
     #Rosenbrock
-    rosen_points = np.array(results['Rosenbrock'][0])
-    rosen_energy = np.array(results['Rosenbrock'][1])
-    rosen_temp = np.array(results['Rosenbrock'][2])
+    rosen_points = np.asarray(results['Rosenbrock'][0])
+    rosen_energy = np.asarray(results['Rosenbrock'][1])
+    rosen_temp = np.asarray(results['Rosenbrock'][2])
 
 
     # Plots
@@ -1,9 +1,10 @@
 import argparse
-import algorithm as ag
 from core_functions import boltz_acceptance_prob, boltz_move, geom_cooling
-from my_function import chosen_function, INTERVAL
+from parallel import best_results, run_suite
+from user_function import chosen_function, INTERVAL
 from plot import plot_results_myfunction, plot_results_tests
-from test_functions import ackley_fn,  himmelblau_fn, rastrigin_fn, rosenbrock_fn
+from Special_functions import ackley_fn,  himmelblau_fn, rastrigin_fn, rosenbrock_fn
+from trajectory import Trajectory, record_modes
 
 
 if __name__ == '__main__':
@@ -17,18 +18,36 @@ if __name__ == '__main__':
     
     parser = argparse.ArgumentParser(description='Simulated Annealing Algorithm', formatter_class=argparse.RawTextHelpFormatter)
     
+    parser.add_argument('-b', '--backend', action='store', nargs='?', const=None, default='python', type=str,
+                        choices=('python', 'jit'), help='Annealing backend, "jit" requires numba. [default: "python"]', metavar=None)
+    
+    parser.add_argument('-g', '--grid', action='store', nargs='?', const=None, default=120, type=int,
+                        choices=None, help='Grid points per axis of the plotted landscapes. [default: 120]', metavar=None)
+    
     parser.add_argument('-k', '--k_max', action='store', nargs='?', const=None, default=1e6, type=int,
                         choices=None, help='Max number of iterations. [default: 1e6]', metavar=None)
     
     parser.add_argument('-m', '--mode', action='store', nargs='?', const=None, default='test', type=str,
                         choices=None, help='[default: "test"]', metavar=None)
     
+    parser.add_argument('-n', '--restarts', action='store', nargs='?', const=None, default=1, type=int,
+                        choices=None, help='Number of random restarts per function. [default: 1]', metavar=None)
+    
     parser.add_argument('-o', '--obj_fn_limit', action='store', nargs='?', const=None, default=-1e10, type=float,
                         choices=None, help='Objective function limit. [default: -1e10]', metavar=None)
     
     parser.add_argument('-r', '--reann', action='store', nargs='?', const=None, default=100, type=float,
                         choices=None, help='Reanniling tolerance value.[default: 100]', metavar=None)
     
+    parser.add_argument('-rm', '--record_mode', action='store', nargs='?', const=None, default='full', type=str,
+                        choices=record_modes, help='Trajectory recording mode. [default: "full"]', metavar=None)
+    
+    parser.add_argument('-re', '--record_every', action='store', nargs='?', const=None, default=1, type=int,
+                        choices=None, help='Recording step for the "every" recording mode. [default: 1]', metavar=None)
+    
+    parser.add_argument('-s', '--seed', action='store', nargs='?', const=None, default=None, type=int,
+                        choices=None, help='Root seed for reproducible runs. [default: None]', metavar=None)
+    
     parser.add_argument('-t', '--init_temp', action='store', nargs='?', const=None, default=100, type=float,
                         choices=None, help='Initial temperature. [default: 100]', metavar=None)
     
@@ -38,6 +57,9 @@ if __name__ == '__main__':
     parser.add_argument('-tv', '--tolerance_value', action='store', nargs='?', const=None, default=1e-10, type=float,
                         choices=None, help='Tolerance Energy value for stopping criterion [default: 1e-6]', metavar=None)
             
+    parser.add_argument('-w', '--workers', action='store', nargs='?', const=None, default=None, type=int,
+                        choices=None, help='Number of worker processes. [default: number of CPUs]', metavar=None)
+    
     parser.add_argument('-v', '--verbose', action='store', nargs='?', const=None, default=False, type=bool,
                         choices=None, help='[default: False]', metavar=None)
         
@@ -50,6 +72,10 @@ if __name__ == '__main__':
     assert args.reann > 0, "Insert positive values"
     assert args.tolerance_iter > 0, "Insert positive values"
     assert args.k_max > 0, "Insert positive values"
+    assert args.record_every > 0, "Insert positive values"
+    assert args.restarts > 0, "Insert positive values"
+    assert args.workers is None or args.workers > 0, "Insert positive values"
+    assert args.grid > 1, "Insert values greater than 1"
 
 # Configuration mode: test functions are used for no "-m" command request.
 
@@ -86,28 +112,31 @@ if __name__ == '__main__':
 
     """
     The algorithm is run according to configuration setup.
-    For cycle is dedicated to test functions only in order to
-    process them and have them plotted in the same 
+    Functions and their random restarts are spread across a pool of 
+    worker processes; for every function the restart with the best 
+    energy is kept, so that test functions can be plotted in the same 
     image.
 
     """
 
-    for fn, par in test_conf.items():
-        states, energies, temp, k, _exit, reann = ag.simulated_annealing(
-                                                        cooling = geom_cooling,
-                                                        acceptance_prob = boltz_acceptance_prob,
-                                                        energy = par[0],
-                                                        move = boltz_move,
-                                                        interval = par[1],
-                                                        initial_temp = args.init_temp,
-                                                        k_max = args.k_max,
-                                                        tolerance_value = args.tolerance_value,
-                                                        tolerance_iter = args.tolerance_iter,
-                                                        obj_fn_limit = args.obj_fn_limit,
-                                                        reann_tol = args.reann,
-                                                        verbose = args.verbose
-                                                        )
-        
+    parameters = dict(cooling = geom_cooling,
+                      acceptance_prob = boltz_acceptance_prob,
+                      move = boltz_move,
+                      initial_temp = args.init_temp,
+                      k_max = args.k_max,
+                      tolerance_value = args.tolerance_value,
+                      tolerance_iter = args.tolerance_iter,
+                      obj_fn_limit = args.obj_fn_limit,
+                      reann_tol = args.reann,
+                      verbose = args.verbose,
+                      recorder = Trajectory(mode = args.record_mode, every = args.record_every)
+                      )
+    
+    runs = run_suite(test_conf, parameters, restarts = args.restarts, workers = args.workers, seed = args.seed,
+                     backend = args.backend)
+
+    for fn, best in best_results(runs).items():
+        states, energies, temp, k, _exit, reann, best_s, best_e = best
         
         #creating specific lists to be fulfilled with obtained values
         results[fn].append(states)
@@ -116,18 +145,21 @@ if __name__ == '__main__':
         exit_interations[fn].append(_exit)
         exit_interations[fn].append(k)
         exit_interations[fn].append(reann)
+        exit_interations[fn].append(best_s)
+        exit_interations[fn].append(best_e)
     
     
     # Results: output shows specific function, stopping criterion, number of iterations and if reannealing occurred + last point to be tested
     for (k,v), (kk,vv) in zip(exit_interations.items(), results.items()):
         last_point = vv[0]
         print("\n")
-        print("Function: {}\nStopping criterion: {}\nNumber of iterations: {}\nLast visited point: {}\nReanniling: {}".format(k,v[0],v[1], last_point[-1], v[2]))
+        print("Function: {}\nStopping criterion: {}\nNumber of iterations: {}\nLast recorded point: {}\nReanniling: {}\nBest point: {}\nBest energy: {}".format(k,v[0],v[1], last_point[-1] if len(last_point) else None, v[2], v[3], v[4]))
 
 
-    # Plots
-    if args.mode == 'test':
-        plot_results_tests(results)
-        
-    else:
-        plot_results_myfunction(results)
+    # Plots: nothing to be shown if the trajectory was not recorded.
+    if args.record_mode != 'none':
+        if args.mode == 'test':
+            plot_results_tests(results, resolution = args.grid)
+            
+        else:
+            plot_results_myfunction(results, resolution = args.grid)
@@ -0,0 +1,180 @@
+"""
+Parallel tempering (replica exchange) mode of the SA_algorithm.
+K replicas sit on a fixed ladder of temperatures: every step each of them makes a
+Boltzmann move and is accepted or rejected at its own temperature, and periodically
+neighbouring replicas try to exchange their states. Hot replicas roam the whole
+domain while cold ones refine the minima they are handed over, so that no cooling
+schedule (and no re-annealing) is needed to escape local minima.
+"""
+
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from algorithm import exit_types, initialization_batch
+from core_functions import boltz_acceptance_prob_batch, boltz_move_batch, random_stream
+
+
+class TemperingResult(namedtuple('TemperingResult', ['states', 'energies', 'temperatures', 'best_state',
+                                                     'best_energy', 'k', 'exit', 'evaluations',
+                                                     'swap_attempts', 'swap_accepts', 'elapsed'])):
+    """
+    Outcome of <<parallel_tempering>>: final states and energies of the replicas (coldest
+    first), the temperature ladder, best state and energy over all replicas, number of
+    steps, exit reason, total evaluations of the objective function, attempted and
+    accepted exchanges for every pair of neighbouring rungs and wall time in seconds.
+    """
+    __slots__ = ()
+
+    @property
+    def swap_rates(self):
+        """Fraction of accepted exchanges between rung i and rung i+1."""
+        return self.swap_accepts / np.maximum(self.swap_attempts, 1)
+
+
+def temperature_ladder(t_min, t_max, n_replicas):
+    """
+    Geometric ladder of n_replicas temperatures from t_min to t_max: neighbouring
+    rungs have the same ratio, which keeps exchange rates even along the ladder.
+    """
+    assert 0 < t_min <= t_max, "Insert positive values"
+    assert n_replicas > 1, "At least two replicas are needed"
+    return np.geomspace(t_min, t_max, n_replicas)
+
+
+def swap_replicas(s, e, temperatures, first, acceptance_prob, rng):
+    """
+    Exchange attempts between rungs (first, first+1), (first+2, first+3), ...
+
+    The exchange between a cold replica c and a hot one h is the Boltzmann acceptance
+    of the hot energy by the cold replica at the effective temperature 1/(1/T_c - 1/T_h):
+    it is always accepted if the hot replica found a lower energy, with probability
+    exp((1/T_c - 1/T_h)(e_c - e_h)) otherwise.
+    It returns the indexes of the cold rungs and which exchanges took place; s and e
+    are swapped in place.
+    """
+    cold = np.arange(first, len(temperatures) - 1, 2)
+    hot = cold + 1
+    t_eff = 1. / (1. / temperatures[cold] - 1. / temperatures[hot])
+    accept = acceptance_prob(e[cold], e[hot], t_eff) >= rng.random(cold.size)
+    c, h = cold[accept], hot[accept]
+    s[[*c, *h]] = s[[*h, *c]]
+    e[[*c, *h]] = e[[*h, *c]]
+    return cold, accept
+
+
+def parallel_tempering(energy, interval, temperatures = None, n_replicas = 8, t_min = 0.01, t_max = 100.,
+                       k_max = 10000, swap_every = 10, obj_fn_limit = -1e10, move = boltz_move_batch,
+                       acceptance_prob = boltz_acceptance_prob_batch, vectorized = False, workers = 1,
+                       rng = None):
+    """
+    Replica exchange: all replicas are advanced in lockstep as a batch (as in
+    <<simulated_annealing_batch>>), each at its fixed temperature; every swap_every
+    steps exchanges are attempted between neighbouring rungs, alternating even and odd
+    pairs.
+
+    Parameters
+    ----------
+    energy: function
+            Objective function of the state X.
+
+    interval: list-like
+              Estremes of a given interval, or per-dimension intervals.
+
+    temperatures: list-like
+                  Temperature ladder [default: temperature_ladder(t_min, t_max, n_replicas)].
+
+    n_replicas, t_min, t_max:
+              Size and extremes of the default geometric ladder.
+
+    k_max: int
+           Max number of steps; every step costs one evaluation per replica.
+
+    swap_every: int
+                Number of steps between two exchange attempts.
+
+    obj_fn_limit: float
+                  Target energy: the run stops as soon as a replica reaches it.
+
+    move, acceptance_prob: function
+                           Vectorized move and acceptance (see boltz_move_batch and
+                           boltz_acceptance_prob_batch); the latter also rules the exchanges.
+
+    vectorized: bool
+                If True, energy is called once per step with coordinate arrays
+                (energy(X) with X of shape (D, K)); otherwise it is called point by point.
+
+    workers: int
+             With more than one worker, point by point evaluations are spread across a
+             pool of processes (energy must be picklable); worth it for expensive objectives.
+
+    rng: numpy Generator, int or SeedSequence
+         Source of random numbers [default: the global numpy.random module].
+
+    Returns
+    ----------
+    TemperingResult
+    """
+    if temperatures is None:
+        temperatures = temperature_ladder(t_min, t_max, n_replicas)
+    temperatures = np.sort(np.asarray(temperatures, dtype = float))
+    assert temperatures[0] > 0, "Temperatures need to be positive floats"
+    assert len(temperatures) > 1, "At least two replicas are needed"
+    assert k_max > 0 and swap_every > 0, "Insert positive values"
+    assert workers > 0, "Insert positive values"
+    n = len(temperatures)
+
+    start = time.perf_counter()
+    rng = random_stream(rng)
+    s, _ = initialization_batch(temperatures[0], interval, n, rng = rng)
+
+    pool = ProcessPoolExecutor(max_workers = min(workers, n)) if workers > 1 and not vectorized else None
+
+    def evaluate(points):
+        if vectorized:
+            return np.asarray(energy(points.T), dtype = float)
+        if pool is not None:
+            return np.fromiter(pool.map(energy, points), dtype = float, count = len(points))
+        return np.fromiter((energy(p) for p in points), dtype = float, count = len(points))
+
+    swap_attempts = np.zeros(n - 1, dtype = np.int64)
+    swap_accepts = np.zeros(n - 1, dtype = np.int64)
+    try:
+        e = evaluate(s)
+        evaluations = n
+        i = np.argmin(e)
+        best_s, best_e = s[i].copy(), e[i]
+
+        k = 0
+        _exit = 0
+        while k < k_max:
+            if best_e <= obj_fn_limit:
+                _exit = 2
+                break
+            k += 1
+
+            #Boltzmann moves of all replicas at their own temperature.
+            new_s = move(s, temperatures, interval, rng)
+            new_e = evaluate(new_s)
+            evaluations += n
+            accept = acceptance_prob(e, new_e, temperatures) >= rng.random(n)
+            s[accept] = new_s[accept]
+            e[accept] = new_e[accept]
+
+            i = np.argmin(e)
+            if e[i] < best_e:
+                best_s, best_e = s[i].copy(), e[i]
+
+            #Exchanges between neighbouring rungs, even and odd pairs in turn.
+            if k % swap_every == 0:
+                cold, accept = swap_replicas(s, e, temperatures, (k // swap_every) % 2, acceptance_prob, rng)
+                swap_attempts[cold] += 1
+                swap_accepts[cold] += accept
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return TemperingResult(s, e, temperatures, best_s, best_e, k, exit_types[_exit], evaluations,
+                           swap_attempts, swap_accepts, time.perf_counter() - start)
@@ -0,0 +1,144 @@
+"""
+Trajectory recording for the SA_algorithm.
+Visited states, energies, temperatures and acceptance flags are stored in a
+preallocated numpy structured array that grows geometrically when full, so that
+long runs do not pile up millions of boxed Python floats and tuples.
+Different recording modes allow to keep only the information actually needed.
+"""
+
+import numpy as np
+
+
+record_modes = ('full', 'every', 'best', 'none')
+
+
+def trajectory_dtype(dim = 2):
+    """
+    It returns the record layout: state coordinates, energy, temperature and
+    whether the move proposed from that state was accepted.
+    """
+    return np.dtype([('state', np.float64, (dim,)),
+                     ('energy', np.float64),
+                     ('temperature', np.float64),
+                     ('accepted', np.bool_)])
+
+
+class Trajectory:
+    """
+    Array-backed recorder of the annealing trajectory.
+
+    Parameters
+    ----------
+
+    mode: str
+          'full'  -> every iteration is recorded;
+          'every' -> one iteration every <<every>> is recorded;
+          'best'  -> only iterations improving the best recorded energy are kept;
+          'none'  -> nothing is recorded.
+
+    every: int
+           Decimation step for the 'every' mode.
+
+    dim: int
+         Number of coordinates of a state.
+
+    capacity: int
+              Initial number of preallocated records; it doubles whenever needed.
+    """
+
+    def __init__(self, mode = 'full', every = 1, dim = 2, capacity = 1024):
+        assert mode in record_modes, "Recording mode must be one of {}".format(record_modes)
+        assert every > 0, "Insert positive values"
+        self.mode = mode
+        self.every = int(every)
+        self.dim = dim
+        self._data = np.empty(max(int(capacity), 1), dtype = trajectory_dtype(dim))
+        self.reset()
+
+    def __len__(self):
+        return self._n
+
+    def record(self, state, energy, temperature):
+        """
+        It stores the current iteration according to the recording mode.
+        """
+        self._calls += 1
+        self._recorded = False
+        mode = self.mode
+        if mode == 'none':
+            return
+        if mode == 'every' and (self._calls - 1) % self.every:
+            return
+        if mode == 'best':
+            if energy >= self._best:
+                return
+            self._best = energy
+        n = self._n
+        if n == len(self._data):
+            self._grow()
+        self._data[n] = (state, energy, temperature, False)
+        self._n = n + 1
+        self._recorded = True
+
+    def extend(self, states, energies, temperatures, accepted):
+        """
+        It appends already selected iterations at once (e.g. recorded by the JIT backend).
+        """
+        n = self._n
+        m = len(energies)
+        while n + m > len(self._data):
+            self._grow()
+        block = self._data[n:n + m]
+        block['state'] = states
+        block['energy'] = energies
+        block['temperature'] = temperatures
+        block['accepted'] = accepted
+        self._n = n + m
+        self._calls += m
+        self._recorded = False
+
+    def mark_accepted(self):
+        """
+        It flags the move proposed from the last recorded state as accepted.
+        """
+        if self._recorded:
+            self._data['accepted'][self._n - 1] = True
+
+    def reset(self):
+        """
+        It discards the recorded iterations (e.g. on re-annealing), keeping the buffer.
+        """
+        self._n = 0
+        self._calls = 0
+        self._best = np.inf
+        self._recorded = False
+
+    def _grow(self):
+        data = np.empty(2 * len(self._data), dtype = self._data.dtype)
+        data[:self._n] = self._data[:self._n]
+        self._data = data
+
+    @property
+    def data(self):
+        """Structured array of the recorded iterations (view, no copy)."""
+        return self._data[:self._n]
+
+    @property
+    def states(self):
+        return self._data['state'][:self._n]
+
+    @property
+    def energies(self):
+        return self._data['energy'][:self._n]
+
+    @property
+    def temperatures(self):
+        return self._data['temperature'][:self._n]
+
+    @property
+    def accepted(self):
+        return self._data['accepted'][:self._n]
+
+    @property
+    def nbytes(self):
+        return self._data.nbytes
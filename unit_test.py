@@ -1,10 +1,22 @@
+import os
+import tempfile
 import unittest
 import numpy as np
 from numpy import random as rnd
 
-from user_function import chosen_function
-from algorithm import initialization, simulated_annealing
-from core_functions import avg_last_k_value, boltz_acceptance_prob, boltz_move, geom_cooling, objective_limit, tolerance
+import jit_backend
+from user_function import chosen_function, formula
+from trajectory import Trajectory
+from instrumentation import Observer
+from plot import landscape_grid
+from benchmark import compare, fixed_length_run, run_benchmarks
+from tempering import parallel_tempering, swap_replicas, temperature_ladder
+from Special_functions import rastrigin_fn
+from parallel import best_results, run_suite
+from algorithm import exit_types, initialization, iter_annealing, simulated_annealing, simulated_annealing_batch
+from core_functions import (avg_last_k_value, boltz_acceptance_prob, boltz_acceptance_prob_batch, boltz_move,
+                            boltz_move_batch, EnergyCache, geom_cooling, objective_limit, tolerance,
+                            ToleranceWindow, BlockRandom)
 
 
 
@@ -64,7 +76,25 @@ class TestSA_alg(unittest.TestCase):
         self.assertGreaterEqual(new_s[1], self.interval[0])
 
     
-    # Testing the validity of the implementation of energy:
+    def test_move_nd(self):  
+        
+        """
+        Testing the Boltzmann move on N-dimensional states with per-dimension bounds
+        """
+
+        rnd.seed(42) #reproducibility
+
+        interval = [(-1, 1)] * 50 + [(-100, 100)] * 50
+        s, temp = initialization(self.initial_temp, interval)
+        self.assertEqual(s.shape, (100,))
+
+        for _ in range(10):
+            s = boltz_move(s, temp, interval)
+            self.assertTrue(np.all(np.abs(s[:50]) <= 1))
+            self.assertTrue(np.all(np.abs(s[50:]) <= 100))
+
+    
+        # Testing the validity of the implementation of energy:
     # we fix a random seed and compare the results of the generation with
     # a given function (2-D function: chosen_function)
 
@@ -146,6 +176,26 @@ class TestSA_alg(unittest.TestCase):
     
     
 
+    def test_tolerance_window(self) :
+
+        """
+        Testing the streaming tolerance criterion: at every step it gives the same decision as <<tolerance>>.
+        """
+
+        rnd.seed(42) #reproducibility
+
+        energies = list(np.cumsum(rnd.uniform(-1, 1, 300) * np.geomspace(1, 1e-12, 300)))
+        window = ToleranceWindow(tolerance = 1e-6, tolerance_iter = 10)
+
+        for i in range(1, len(energies) + 1):
+            self.assertEqual(window.update(energies[i-1]), tolerance(energies[:i], 1e-6, 10))
+
+        window.reset()
+        self.assertFalse(window.update(energies[-1]))
+
+    
+
+
     def test_objective_limit(self) :
 
         """
@@ -171,7 +221,7 @@ class TestSA_alg(unittest.TestCase):
 
        
         
-        states, energies, temp, k, _exit, reann = simulated_annealing(
+        states, energies, temp, k, _exit, reann, best_s, best_e = simulated_annealing(
                                                 cooling = geom_cooling,
                                                 energy = chosen_function,
                                                 acceptance_prob = boltz_acceptance_prob,
@@ -186,8 +236,362 @@ class TestSA_alg(unittest.TestCase):
         print("Minimum:", states[-1])
         self.assertAlmostEqual(np.floor(abs(abs(states[-1][0])-delta_err)), 0.), "The found minimum is far from what expected"
         self.assertAlmostEqual(np.floor(abs(abs(states[-1][1])-delta_err)), 0.), "The found minimum is far from what expected"
+
+        # The incrementally tracked best solution is consistent with the visited states
+        self.assertLessEqual(best_e, min(energies))
+        self.assertEqual(best_e, chosen_function(best_s))
         
 
+
+
+    def test_block_random(self) :
+
+        """
+        Testing the block-drawn random numbers: the sequence only depends on the seed, not on the block size,
+        and the global numpy.random state is left untouched by a run with an injected generator.
+        """
+
+        small, large = BlockRandom(42, block_size = 3), BlockRandom(np.random.default_rng(42))
+        self.assertEqual([small.random() for _ in range(10)], list(np.random.default_rng(42).random(10)))
+        large.random(10)
+        self.assertTrue(np.array_equal(small.random(7), large.random(7)))
+        self.assertTrue(np.all(small.uniform(-1, [1, 2, 3]) < [1, 2, 3]))
+
+        parameters = dict(cooling = geom_cooling, energy = chosen_function, acceptance_prob = boltz_acceptance_prob,
+                          move = boltz_move, tolerance_value = 1e-10, initial_temp = self.initial_temp,
+                          interval = self.interval)
+
+        rnd.seed(42)
+        global_state = rnd.get_state()[1].copy()
+        r1 = simulated_annealing(rng = np.random.default_rng(7), **parameters)
+        r2 = simulated_annealing(rng = BlockRandom(7, block_size = 5), **parameters)
+        self.assertTrue(np.array_equal(rnd.get_state()[1], global_state))
+        self.assertTrue(np.array_equal(r1.states, r2.states))
+        self.assertEqual((r1.k, r1.exit), (r2.k, r2.exit))
+
+
+
+    def test_sa_nd(self) :
+
+        """
+        Test on ALGORITHM with a 10-dimensional state: states stay in the domain and the energy is lowered
+        """
+
+        rnd.seed(42) #reproducibility
+
+        result = simulated_annealing(cooling = geom_cooling, energy = lambda X : float(np.sum(X**2)),
+                                     acceptance_prob = boltz_acceptance_prob, move = boltz_move,
+                                     tolerance_value = 1e-10, initial_temp = self.initial_temp,
+                                     interval = [self.interval] * 10)
+
+        self.assertEqual(result.states.shape[1], 10)
+        self.assertEqual(len(result.best_state), 10)
+        self.assertTrue(np.all(np.abs(result.states) <= self.interval[1]))
+        self.assertLessEqual(result.best_energy, result.energies[0])
+
+
+
+    def test_iter_annealing(self) :
+
+        """
+        Test on STREAMING ALGORITHM: for a fixed seed the step records lead to the same
+        outcome of simulated_annealing; the caller can stop whenever it wants.
+        """
+
+        parameters = dict(cooling = geom_cooling, energy = chosen_function, acceptance_prob = boltz_acceptance_prob,
+                          move = boltz_move, tolerance_value = 1e-10, initial_temp = self.initial_temp,
+                          interval = self.interval)
+
+        rnd.seed(42) #reproducibility
+        result = simulated_annealing(**parameters)
+
+        rnd.seed(42)
+        steps = list(iter_annealing(**parameters))
+        self.assertEqual(steps[-1].exit, result.exit)
+        self.assertEqual(steps[-1].k, result.k)
+        self.assertEqual(steps[-1].best_energy, result.best_energy)
+        self.assertTrue(all(step.exit is None for step in steps[:-1]))
+
+        rnd.seed(42)
+        chunks = list(iter_annealing(chunk_size = 50, **parameters))
+        self.assertEqual(sum(len(chunk) for chunk in chunks), len(steps))
+        self.assertTrue(all(len(chunk) == 50 for chunk in chunks[:-1]))
+
+        for step in iter_annealing(**parameters):
+            if step.k == 5:
+                break
+        self.assertEqual(step.k, 5)
+
+
+
+    def test_run_suite(self) :
+
+        """
+        Test on PARALLEL RUNNER: restarts get independent seeds and results do not depend on the number of workers
+        """
+
+        test_conf = {"chosen_function" : [chosen_function, self.interval]}
+        parameters = dict(cooling = geom_cooling, acceptance_prob = boltz_acceptance_prob, move = boltz_move,
+                          initial_temp = self.initial_temp, tolerance_value = 1e-10)
+
+        serial = run_suite(test_conf, parameters, restarts = 3, workers = 1, seed = 42)
+        pooled = run_suite(test_conf, parameters, restarts = 3, workers = 2, seed = 42)
+
+        energies = [run.best_energy for run in serial["chosen_function"]]
+        self.assertEqual(len(energies), 3)
+        self.assertEqual(len(set(energies)), 3)
+        self.assertEqual(energies, [run.best_energy for run in pooled["chosen_function"]])
+        self.assertEqual(best_results(serial)["chosen_function"].best_energy, min(energies))
+
+
+
+    def test_energy_cache(self):
+
+        """
+        Testing the LRU memoization of energy: revisited states are not evaluated again
+        and the least recently used entry is dropped once the cache is full.
+        """
+
+        calls = []
+        def counted(X):
+            calls.append(X)
+            return chosen_function(X)
+
+        cached = EnergyCache(counted, maxsize = 2)
+        self.assertEqual(cached((1., 2.)), 5.)
+        self.assertEqual(cached((1., 2.)), 5.)
+        cached((0., 1.))
+        cached((3., 0.)) # (1., 2.) is evicted
+        cached((1., 2.))
+
+        self.assertEqual(len(calls), 4)
+        self.assertEqual(cached.info(), {'hits' : 1, 'misses' : 4, 'size' : 2, 'maxsize' : 2})
+
+
+
+    def test_trajectory(self):
+
+        """
+        Testing the trajectory recorder: buffers grow as needed and recording modes decimate the stored iterations
+        """
+
+        energies = [5., 3., 4., 1., 2., 0.5]
+        recorders = {mode : Trajectory(mode = mode, every = 2, capacity = 1) for mode in ('full', 'every', 'best', 'none')}
+        for i, e in enumerate(energies):
+            for recorder in recorders.values():
+                recorder.record((i, -i), e, 100. - i)
+                recorder.mark_accepted()
+
+        self.assertEqual(list(recorders['full'].energies), energies)
+        self.assertEqual(recorders['full'].states.shape, (6, 2))
+        self.assertTrue(np.all(recorders['full'].accepted))
+        self.assertEqual(list(recorders['every'].energies), [5., 4., 2.])
+        self.assertEqual(list(recorders['best'].energies), [5., 3., 1., 0.5])
+        self.assertEqual(len(recorders['none']), 0)
+
+        recorders['full'].reset()
+        self.assertEqual(len(recorders['full']), 0)
+
+
+
+    def test_move_batch(self):
+
+        """
+        Testing the batched Boltzmann move: every proposed state is in the given interval
+        """
+
+        rnd.seed(42) #reproducibility
+
+        states = rnd.uniform(self.interval[0], self.interval[1], size = (100, 2))
+        temps = np.full(100, float(self.initial_temp))
+        new_states = boltz_move_batch(states, temps, self.interval)
+
+        self.assertEqual(new_states.shape, states.shape)
+        self.assertTrue(np.all(new_states <= self.interval[1]))
+        self.assertTrue(np.all(new_states >= self.interval[0]))
+
+
+
+    def test_sa_batch(self):
+
+        """
+        Test on BATCHED ALGORITHM: every chain reports its own exit and the best chain finds the minimum in [0,0]
+        """
+
+        rnd.seed(42) #reproducibility
+
+        n_chains = 50
+        result = simulated_annealing_batch(
+                                cooling = geom_cooling,
+                                acceptance_prob = boltz_acceptance_prob_batch,
+                                energy = chosen_function,
+                                move = boltz_move_batch,
+                                interval = self.interval,
+                                n_chains = n_chains,
+                                initial_temp = self.initial_temp,
+                                tolerance_value = 1e-10,
+                                vectorized = True
+                                )
+
+        self.assertEqual(result.states.shape, (n_chains, 2))
+        self.assertEqual(len(result.exit), n_chains)
+        self.assertTrue(set(result.exit) <= set(exit_types.values()))
+        self.assertTrue(np.all(result.best_energies <= result.energies))
+        self.assertGreater(result.chain_steps, 0)
+        best = result.best_states[np.argmin(result.best_energies)]
+        self.assertLess(np.max(np.abs(best)), 1.)
+
+
+
+    def test_jit_backend(self):
+
+        """
+        Test on JIT BACKEND: the fused kernel (run here as plain Python) visits the same states of
+        simulated_annealing for a fixed seed, and unsupported configurations fall back to it.
+        """
+
+        parameters = dict(cooling = geom_cooling, acceptance_prob = boltz_acceptance_prob, move = boltz_move,
+                          energy = chosen_function, interval = self.interval, initial_temp = self.initial_temp,
+                          tolerance_value = 1e-10)
+        self.assertTrue(jit_backend.supported(geom_cooling, boltz_acceptance_prob, chosen_function, boltz_move,
+                                              self.interval))
+
+        result = simulated_annealing(rng = 42, **parameters)
+        fused = jit_backend._run(jit_backend._anneal_kernel, formula, geom_cooling, self.interval,
+                                 self.initial_temp, 1e10, 1e-10, 10, -1e10, 100, None, 42, block_size = 100)
+        self.assertEqual((fused.k, fused.exit, fused.reann), (result.k, result.exit, result.reann))
+        self.assertEqual(fused.best_energy, result.best_energy)
+        self.assertTrue(np.array_equal(fused.states, result.states))
+        self.assertTrue(np.array_equal(fused.energies, result.energies))
+
+        parameters['energy'] = lambda X : X[0]**2 + X[1]**2
+        self.assertFalse(jit_backend.supported(geom_cooling, boltz_acceptance_prob, parameters['energy'],
+                                               boltz_move, self.interval))
+        fallback = jit_backend.simulated_annealing_jit(rng = 42, **parameters)
+        self.assertEqual(fallback.best_energy, result.best_energy)
+
+
+
+
+    def test_parallel_tempering(self):
+
+        """
+        Test on REPLICA EXCHANGE: lower hot energies are always handed to the colder rung, and
+        the replicas reach a low Rastrigin energy counting one evaluation per replica per step.
+        """
+
+        temperatures = temperature_ladder(0.01, 100., 4)
+        self.assertAlmostEqual(temperatures[1] / temperatures[0], temperatures[3] / temperatures[2])
+        s = np.arange(8.).reshape(4, 2)
+        e = np.array([3., 0., 5., 4.])
+        cold, accept = swap_replicas(s, e, temperatures, 0, boltz_acceptance_prob_batch, rnd)
+        self.assertTrue(np.array_equal(cold, [0, 2]))
+        self.assertTrue(np.array_equal(accept, [True, True]))
+        self.assertTrue(np.array_equal(e, [0., 3., 4., 5.]))
+        self.assertTrue(np.array_equal(s[0], [2., 3.]))
+
+        result = parallel_tempering(rastrigin_fn, (-5.12, 5.12), k_max = 20000, obj_fn_limit = 1., rng = 0)
+        self.assertEqual(result.exit, exit_types[2])
+        self.assertLessEqual(result.best_energy, 1.)
+        self.assertEqual(result.evaluations, len(result.temperatures) * (result.k + 1))
+        self.assertEqual(len(result.swap_rates), len(result.temperatures) - 1)
+        self.assertTrue(np.all((result.swap_rates >= 0) & (result.swap_rates <= 1)))
+
+
+
+
+    def test_landscape_grid(self):
+
+        """
+        Test on LANDSCAPE GRIDS: the batch evaluation matches point by point values and
+        the grid is read back from the .npz cache on the next request.
+        """
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            X, Y, Z = landscape_grid(chosen_function, self.interval, 30, cache_dir)
+            self.assertEqual(Z.shape, (30, 30))
+            self.assertEqual((X.min(), X.max(), Y.min(), Y.max()), (-6., 6., -6., 6.))
+            self.assertEqual(Z[4, 17], chosen_function((X[4, 17], Y[4, 17])))
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+            path = os.path.join(cache_dir, os.listdir(cache_dir)[0])
+            np.savez(path, X = X, Y = Y, Z = Z + 1.)
+            self.assertTrue(np.array_equal(landscape_grid(chosen_function, self.interval, 30, cache_dir)[2], Z + 1.))
+
+        calls = []
+        def scalar_only(X):
+            calls.append(X)
+            return float(chosen_function(X))
+        looped = landscape_grid(scalar_only, self.interval, 20, None)
+        self.assertEqual(len(calls), 1 + 20 * 20)
+        self.assertTrue(np.allclose(looped[2], landscape_grid(chosen_function, self.interval, 20, None)[2]))
+
+
+
+
+    def test_benchmark(self):
+
+        """
+        Test on BENCHMARK SUITE: fixed-length runs stop on k_max only, every case is reported and
+        slower or hungrier cases than the baseline are flagged as regressions.
+        """
+
+        result = fixed_length_run(chosen_function, self.interval, 500)
+        self.assertEqual((result.k, result.exit), (501, exit_types[0]))
+
+        report = run_benchmarks(micro_steps = 200, macro_steps = 50, repeat = 1)
+        self.assertEqual(len(report["results"]), 9)
+        self.assertTrue(all(case["steps_per_sec"] > 0 and case["peak_bytes"] > 0
+                            for case in report["results"].values()))
+        self.assertEqual(compare(report, report), [])
+
+        baseline = {"results" : {"macro.Ackley" : dict(report["results"]["macro.Ackley"])}}
+        baseline["results"]["macro.Ackley"]["steps_per_sec"] *= 2
+        regressions = compare(report, baseline, threshold = 0.2)
+        self.assertEqual([(r["case"], r["metric"]) for r in regressions], [("macro.Ackley", "steps_per_sec")])
+
+
+
+
+    def test_observer_stats(self):
+
+        """
+        Test on INSTRUMENTATION: observer callbacks agree with the run statistics, every step ends
+        with one outcome and the objective time is a share of the whole run.
+        """
+
+        class Counter(Observer):
+            def __init__(self):
+                self.calls = {'step' : 0, 'accept' : 0, 'reject' : 0, 'reanneal' : 0}
+                self.exit = []
+            def on_step(self, k, state, energy, temperature):
+                self.calls['step'] += 1
+            def on_accept(self, k, state, energy):
+                self.calls['accept'] += 1
+            def on_reject(self, k, state, energy):
+                self.calls['reject'] += 1
+            def on_reanneal(self, k, state, energy):
+                self.calls['reanneal'] += 1
+            def on_exit(self, exit, k, best_state, best_energy):
+                self.exit.append(exit)
+
+        observer = Counter()
+        result = simulated_annealing(cooling = geom_cooling, acceptance_prob = boltz_acceptance_prob,
+                                     energy = chosen_function, move = boltz_move, interval = (-1, 1),
+                                     initial_temp = self.initial_temp, tolerance_value = 1e-10, reann_tol = 0.5,
+                                     rng = 42, observer = observer)
+        stats = result.stats
+
+        self.assertEqual(observer.exit, [result.exit])
+        self.assertEqual(observer.calls['accept'], stats.accepted)
+        self.assertEqual(observer.calls['reject'], stats.rejected)
+        self.assertEqual(observer.calls['reanneal'], stats.reanneals)
+        self.assertEqual(observer.calls['step'], stats.steps + 1)
+        self.assertGreater(stats.reanneals, 0)
+        self.assertGreater(stats.clips, 0)
+        self.assertEqual(stats.evaluations, stats.steps + 1)
+        self.assertEqual(stats.accepted + stats.rejected + stats.reanneals + 1, stats.steps)
+        self.assertTrue(0 < stats.objective_time < stats.total_time)
     
    
     
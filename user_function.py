@@ -1,6 +1,18 @@
 #insert user function
 import numpy as np
 INTERVAL=[-6,6]
+def formula(x, y):
+    """
+    Mathematical expression of chosen_function in terms of the two coordinates.
+    
+    Keep it to plain arithmetic and numpy functions: this way it can also be 
+    compiled by the optional JIT backend (see jit_backend.py).
+    
+    """
+    #Insert your function of interest here, remember to change INTERVAL values if needed.#
+    #for example
+    return x**2+y**2
+
 def chosen_function(X):
     """
     It creates chosen_function of X = (x,y).
@@ -14,9 +26,8 @@ def chosen_function(X):
     x=X[0]
     y=X[1]
     
-    #Insert your function of interest here, remember to change INTERVAL values if needed.#
-    #for example
-    a=x**2+y**2
+    #the function of interest is written in <<formula>>
+    a=formula(x, y)
 
     #test function for correctness of implemented value.
     """
@@ -24,6 +35,10 @@ def chosen_function(X):
     """
     if type(a) == float:
         
+        return(a)
+    elif type(a) == np.ndarray:
+        #batched evaluation: X holds arrays of coordinates
+        assert a.dtype == np.float64
         return(a)
     else:
         assert type(a) == np.float64